@@ -0,0 +1,24 @@
+"""
+In-process microbenchmarks for the acquire hot path.
+
+The suite runs against ``tests.mocks.TestPoolManager``, so it measures
+balancer policies and ``PoolAcquireContext`` without a database and
+network in the way. Run it with ``python -m benchmarks``.
+"""
+
+from .acquire import (
+    BenchmarkCase,
+    BenchmarkResult,
+    compare_results,
+    run_case,
+    run_suite,
+)
+
+
+__all__ = (
+    "BenchmarkCase",
+    "BenchmarkResult",
+    "compare_results",
+    "run_case",
+    "run_suite",
+)
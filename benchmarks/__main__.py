@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from .acquire import (
+    DEFAULT_ACQUIRES,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_HOSTS,
+    DEFAULT_POLICIES,
+    DEFAULT_READ_RATIO,
+    POLICIES,
+    BenchmarkCase,
+    compare_results,
+    run_suite,
+)
+
+
+parser = argparse.ArgumentParser(
+    prog="python -m benchmarks",
+    description="Benchmark hasql acquire hot path with in-process pools",
+)
+parser.add_argument(
+    "--policy", nargs="+", choices=sorted(POLICIES),
+    default=list(DEFAULT_POLICIES),
+)
+parser.add_argument(
+    "--hosts", nargs="+", type=int, default=list(DEFAULT_HOSTS),
+)
+parser.add_argument(
+    "--concurrency", nargs="+", type=int, default=list(DEFAULT_CONCURRENCY),
+)
+parser.add_argument(
+    "--acquires", type=int, default=DEFAULT_ACQUIRES,
+    help="Acquires performed by all tasks of a single case",
+)
+parser.add_argument("--read-ratio", type=float, default=DEFAULT_READ_RATIO)
+parser.add_argument(
+    "-o", "--output", default="-",
+    help="File to write JSON results to, '-' for stdout",
+)
+parser.add_argument(
+    "--compare", metavar="BASELINE",
+    help="JSON results of a previous run to compare with",
+)
+parser.add_argument(
+    "--max-regression", type=float, default=None,
+    help="Exit with non-zero code when any metric regresses by more "
+         "than this fraction compared to the baseline, e.g. 0.1",
+)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def main() -> int:
+    arguments = parser.parse_args()
+
+    cases = [
+        BenchmarkCase(
+            policy=policy,
+            hosts=hosts,
+            concurrency=concurrency,
+            acquires=arguments.acquires,
+            read_ratio=arguments.read_ratio,
+        )
+        for policy, hosts, concurrency in itertools.product(
+            arguments.policy, arguments.hosts, arguments.concurrency,
+        )
+    ]
+
+    results = asyncio.run(run_suite(cases))
+    for result in results:
+        log(
+            f"{result.name:<48} {result.acquires_per_second:>10.0f} acq/s "
+            f"p50={result.p50_ms:.3f}ms p99={result.p99_ms:.3f}ms",
+        )
+
+    report: Dict[str, Any] = {
+        "revision": git_revision(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "results": [asdict(result) for result in results],
+    }
+
+    output = json.dumps(report, indent=2)
+    if arguments.output == "-":
+        print(output)
+    else:
+        with open(arguments.output, "w") as fp:
+            fp.write(output + "\n")
+
+    if arguments.compare is None:
+        return 0
+
+    with open(arguments.compare) as fp:
+        baseline = json.load(fp)
+
+    regressions: List[str] = []
+    changes = compare_results(baseline["results"], report["results"])
+    for name, metrics in changes.items():
+        for metric, change in metrics.items():
+            if change is None:
+                continue
+            log(f"{name:<48} {metric:<20} {change:+.1%}")
+            if (
+                arguments.max_regression is not None and
+                change > arguments.max_regression
+            ):
+                regressions.append(f"{name} {metric}")
+
+    if regressions:
+        log("Regressions: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import (
+    Any, Dict, Iterable, List, Mapping, Optional, Sequence, Type,
+)
+
+from hasql.balancer_policy import (
+    EwmaBalancerPolicy,
+    GreedyBalancerPolicy,
+    PowerOfTwoChoicesBalancerPolicy,
+    RandomWeightedBalancerPolicy,
+    RoundRobinBalancerPolicy,
+)
+from hasql.base import AbstractBalancerPolicy
+from tests.mocks import TestPoolManager
+
+
+POLICIES: Mapping[str, Type[AbstractBalancerPolicy]] = {
+    "greedy": GreedyBalancerPolicy,
+    "random_weighted": RandomWeightedBalancerPolicy,
+    "round_robin": RoundRobinBalancerPolicy,
+    "power_of_two_choices": PowerOfTwoChoicesBalancerPolicy,
+    "ewma": EwmaBalancerPolicy,
+}
+
+DEFAULT_POLICIES = ("greedy", "random_weighted", "round_robin")
+DEFAULT_HOSTS = (1, 3, 10, 100)
+DEFAULT_CONCURRENCY = (1, 100, 1000, 10000)
+DEFAULT_ACQUIRES = 20000
+DEFAULT_READ_RATIO = 0.8
+
+# Keys of BenchmarkResult compared between runs, and whether
+# a higher value is better for that key
+COMPARED_METRICS: Mapping[str, bool] = {
+    "acquires_per_second": True,
+    "p50_ms": False,
+    "p99_ms": False,
+}
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    policy: str
+    hosts: int
+    concurrency: int
+    acquires: int = DEFAULT_ACQUIRES
+    read_ratio: float = DEFAULT_READ_RATIO
+
+    @property
+    def name(self) -> str:
+        return f"{self.policy}/hosts={self.hosts}/tasks={self.concurrency}"
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    name: str
+    policy: str
+    hosts: int
+    concurrency: int
+    acquires: int
+    elapsed: float
+    acquires_per_second: float
+    p50_ms: float
+    p99_ms: float
+
+
+def make_dsn(hosts: int) -> str:
+    # TestPool treats the host called "master" as the master,
+    # all the other hosts are replicas
+    replica_hosts = [f"replica{i}" for i in range(1, hosts)]
+    hosts_part = ",".join(["master:5432"] + replica_hosts)
+    return f"postgresql://test:test@{hosts_part}/test"
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    if not sorted_values:
+        return 0.
+    index = min(int(p * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def _worker(
+    pool_manager: TestPoolManager,
+    case: BenchmarkCase,
+    remaining: List[int],
+    latencies: List[float],
+) -> None:
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        read_only = random.random() < case.read_ratio
+        started_at = time.perf_counter()
+        async with pool_manager.acquire(
+            read_only=read_only, fallback_master=True,
+        ):
+            latencies.append(time.perf_counter() - started_at)
+            # Give the other tasks a chance to contend for the pool
+            await asyncio.sleep(0)
+
+
+async def run_case(
+    case: BenchmarkCase, **pool_manager_kwargs: Any,
+) -> BenchmarkResult:
+    pool_manager_kwargs.setdefault("acquire_timeout", 60)
+    pool_manager = TestPoolManager(
+        dsn=make_dsn(case.hosts),
+        balancer_policy=POLICIES[case.policy],
+        **pool_manager_kwargs,
+    )
+    try:
+        await pool_manager.ready(
+            masters_count=1, replicas_count=case.hosts - 1,
+        )
+
+        remaining = [case.acquires]
+        latencies: List[float] = []
+        started_at = time.perf_counter()
+        await asyncio.gather(
+            *(
+                _worker(pool_manager, case, remaining, latencies)
+                for _ in range(case.concurrency)
+            ),
+        )
+        elapsed = time.perf_counter() - started_at
+    finally:
+        await pool_manager.close()
+
+    latencies.sort()
+    return BenchmarkResult(
+        name=case.name,
+        policy=case.policy,
+        hosts=case.hosts,
+        concurrency=case.concurrency,
+        acquires=len(latencies),
+        elapsed=elapsed,
+        acquires_per_second=len(latencies) / elapsed if elapsed else 0.,
+        p50_ms=percentile(latencies, 0.5) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+    )
+
+
+async def run_suite(
+    cases: Iterable[BenchmarkCase], **pool_manager_kwargs: Any,
+) -> List[BenchmarkResult]:
+    results = []
+    for case in cases:
+        results.append(await run_case(case, **pool_manager_kwargs))
+    return results
+
+
+def compare_results(
+    baseline: Iterable[Mapping[str, Any]],
+    current: Iterable[Mapping[str, Any]],
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Returns relative change of each compared metric per case, positive
+    values are regressions. Cases missing from the baseline are skipped.
+    """
+    baseline_by_name = {result["name"]: result for result in baseline}
+    changes: Dict[str, Dict[str, Optional[float]]] = {}
+    for result in current:
+        previous = baseline_by_name.get(result["name"])
+        if previous is None:
+            continue
+        changes[result["name"]] = {}
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not previous[metric]:
+                changes[result["name"]][metric] = None
+                continue
+            change = (result[metric] - previous[metric]) / previous[metric]
+            changes[result["name"]][metric] = (
+                -change if higher_is_better else change
+            )
+    return changes
+
+
+__all__ = (
+    "BenchmarkCase",
+    "BenchmarkResult",
+    "compare_results",
+    "run_case",
+    "run_suite",
+)
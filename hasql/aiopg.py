@@ -1,7 +1,10 @@
 import asyncio
+from contextlib import nullcontext
+from functools import partial
 from typing import Sequence
 
 import aiopg
+import psycopg2
 
 from hasql.base import BasePoolManager, TimeoutAcquireContext
 from hasql.metrics import DriverMetrics
@@ -10,6 +13,10 @@ from hasql.utils import Dsn
 
 class PoolManager(BasePoolManager):
     pools: Sequence[aiopg.Pool]
+    _pool_min_size_kwarg = "minsize"
+    _pool_only_kwargs = frozenset((
+        "minsize", "maxsize", "pool_recycle", "on_connect",
+    ))
 
     # TODO: _timeout is a smuggled kwarg key — consider returning a
     #  (kwargs, timeout) tuple from _prepare_acquire_kwargs instead.
@@ -22,34 +29,64 @@ class PoolManager(BasePoolManager):
         prepared_kwargs["_timeout"] = timeout
         return prepared_kwargs
 
+    def _is_connection_error(self, error: Exception) -> bool:
+        return super()._is_connection_error(error) or isinstance(
+            error, (psycopg2.OperationalError, psycopg2.InterfaceError),
+        )
+
     def get_pool_freesize(self, pool):
         return pool.freesize
 
+    def get_pool_waiters(self, pool) -> int:
+        return len(pool._cond._waiters)
+
     def acquire_from_pool(self, pool, **kwargs):
         timeout = kwargs.pop("_timeout", None)
         ctx = pool.acquire(**kwargs)
         if timeout is not None:
-            return TimeoutAcquireContext(ctx, timeout)
+            return TimeoutAcquireContext(
+                ctx,
+                timeout,
+                release_timeout=self.release_timeout,
+                on_release_timeout=partial(self._reap_release, pool),
+            )
         return ctx
 
     async def release_to_pool(self, connection, pool, **kwargs):
         return await pool.release(connection, **kwargs)
 
-    async def _is_master(self, connection):
+    async def _terminate_connection(self, connection):
+        connection.close()
+
+    async def _fetchrow(self, connection, query: str):
         cursor = await connection.cursor()
         async with cursor:
-            await cursor.execute("SHOW transaction_read_only")
-            read_only = await cursor.fetchone()
-            return read_only[0] == "off"
+            await cursor.execute(query)
+            return await cursor.fetchone()
 
     async def _pool_factory(self, dsn: Dsn):
-        return await aiopg.create_pool(str(dsn), **self.pool_factory_kwargs)
+        return await aiopg.create_pool(
+            str(dsn), **self.pool_factory_kwargs_for(dsn),
+        )
 
     def _prepare_pool_factory_kwargs(self, kwargs: dict) -> dict:
-        kwargs["minsize"] = kwargs.get("minsize", 1) + 1
-        kwargs["maxsize"] = kwargs.get("maxsize", 10) + 1
+        kwargs["minsize"] = (
+            kwargs.get("minsize", 1) + self._pool_reserved_size
+        )
+        kwargs["maxsize"] = (
+            kwargs.get("maxsize", 10) + self._pool_reserved_size
+        )
         return kwargs
 
+    async def _warm_up_pool(self, pool: aiopg.Pool):
+        # aiopg keeps minsize connections open by itself, so the pool gets
+        # the configured value back and is filled the way aiopg fills
+        # a new one, a connection at a time
+        pool._minsize = self.pool_factory_kwargs["minsize"]
+        async with self._warm_up_semaphore or nullcontext():
+            async with pool._cond:
+                await pool._fill_free_pool(False)
+
     async def _close(self, pool):
         pool.close()
         await pool.wait_closed()
@@ -61,6 +98,12 @@ class PoolManager(BasePoolManager):
     def is_connection_closed(self, connection):
         return connection.closed
 
+    async def _connect_probe(self, pool, dsn: Dsn):
+        return await aiopg.connect(str(dsn), **self._probe_connect_kwargs())
+
+    async def _close_probe(self, connection):
+        await connection.close()
+
     def host(self, pool: aiopg.Pool):
         return Dsn.parse(str(pool._dsn)).netloc
 
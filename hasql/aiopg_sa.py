@@ -10,17 +10,39 @@ from hasql.utils import Dsn
 
 class PoolManager(AioPgPoolManager):
     pools: Sequence[aiopg.sa.Engine]  # type: ignore[assignment]
+    _pool_only_kwargs = AioPgPoolManager._pool_only_kwargs | {"dialect"}
 
-    async def _is_master(self, connection):
-        read_only = await connection.scalar("SHOW transaction_read_only")
-        return read_only == "off"
+    async def _fetchrow(self, connection, query: str):
+        result = await connection.execute(query)
+        return await result.first()
 
     async def _pool_factory(self, dsn: Dsn) -> aiopg.sa.Engine:
         return await aiopg.sa.create_engine(
             str(dsn),
-            **self.pool_factory_kwargs,
+            **self.pool_factory_kwargs_for(dsn),
         )
 
+    async def _warm_up_pool(  # type: ignore[override]
+        self, pool: aiopg.sa.Engine,
+    ):
+        await super()._warm_up_pool(pool._pool)
+
+    async def _connect_probe(self, pool: aiopg.sa.Engine, dsn: Dsn):
+        connection = await super()._connect_probe(pool, dsn)
+        return aiopg.sa.SAConnection(connection, pool)
+
+    async def _close_probe(self, connection):
+        # SAConnection.close() would return the connection to the engine
+        await super()._close_probe(connection.connection)
+
+    def get_pool_waiters(self, pool: aiopg.sa.Engine) -> int:
+        return super().get_pool_waiters(pool._pool)
+
+    async def _terminate_connection(self, connection):
+        # SAConnection drops the reference to the raw connection on close
+        if connection.connection is not None:
+            connection.connection.close()
+
     def host(self, pool: aiopg.sa.Engine) -> str:  # type: ignore[override]
         return parse_dsn(pool.dsn).get("host", "")
 
@@ -11,6 +11,17 @@ from hasql.utils import Dsn
 
 class PoolManager(BasePoolManager):
     pools: Sequence[asyncpg.Pool]
+    _pool_min_size_kwarg = "min_size"
+    _pool_only_kwargs = frozenset((
+        "min_size",
+        "max_size",
+        "max_queries",
+        "max_inactive_connection_lifetime",
+        "setup",
+        "init",
+        "reset",
+        "loop",
+    ))
     cached_hosts: ClassVar[Dict[int, str]] = {}
 
     def _prepare_acquire_kwargs(
@@ -22,27 +33,52 @@ class PoolManager(BasePoolManager):
         prepared_kwargs["timeout"] = timeout
         return prepared_kwargs
 
+    def _is_connection_error(self, error: Exception) -> bool:
+        return super()._is_connection_error(error) or isinstance(
+            error,
+            (
+                asyncpg.exceptions.PostgresConnectionError,
+                asyncpg.exceptions.CannotConnectNowError,
+                asyncpg.exceptions.ConnectionDoesNotExistError,
+            ),
+        )
+
     def get_pool_freesize(self, pool):
         return pool._queue.qsize()
 
+    def get_pool_waiters(self, pool) -> int:
+        return len(pool._queue._getters)
+
     def acquire_from_pool(self, pool, **kwargs):
         return pool.acquire(**kwargs)
 
     async def release_to_pool(self, connection, pool, **kwargs):
         await pool.release(connection, **kwargs)
 
-    async def _is_master(self, connection):
-        read_only = await connection.fetchrow("SHOW transaction_read_only")
-        return read_only[0] == "off"
+    async def _fetchrow(self, connection, query: str):
+        return await connection.fetchrow(query)
 
     async def _pool_factory(self, dsn: Dsn):
-        return await asyncpg.create_pool(str(dsn), **self.pool_factory_kwargs)
+        return await asyncpg.create_pool(
+            str(dsn), **self.pool_factory_kwargs_for(dsn),
+        )
 
     def _prepare_pool_factory_kwargs(self, kwargs: dict) -> dict:
-        kwargs["min_size"] = kwargs.get("min_size", 1) + 1
-        kwargs["max_size"] = kwargs.get("max_size", 10) + 1
+        kwargs["min_size"] = (
+            kwargs.get("min_size", 1) + self._pool_reserved_size
+        )
+        kwargs["max_size"] = (
+            kwargs.get("max_size", 10) + self._pool_reserved_size
+        )
         return kwargs
 
+    async def _warm_up_pool(self, pool: asyncpg.Pool):
+        await super()._warm_up_pool(pool)
+        # asyncpg opens min_size connections only when the pool starts, the
+        # warm-up has opened them instead, so the pool reports the
+        # configured value again
+        pool._minsize = self.pool_factory_kwargs["min_size"]
+
     async def _close(self, pool):
         await pool.close()
 
@@ -53,6 +89,14 @@ class PoolManager(BasePoolManager):
     def is_connection_closed(self, connection):
         return connection.is_closed()
 
+    async def _connect_probe(self, pool, dsn: Dsn):
+        return await asyncpg.connect(
+            str(dsn), **self._probe_connect_kwargs(),
+        )
+
+    async def _close_probe(self, connection):
+        await connection.close()
+
     if parse_version(asyncpg.__version__) >= parse_version("0.29.0"):
         # We try to reproduce the same behaviour of the _working_addr
         # attribute prior the 0.29.0 version for getting the host
@@ -6,7 +6,7 @@ from hasql.utils import Dsn
 class PoolManager(AsyncPgPoolManager):
     async def _pool_factory(self, dsn: Dsn):
         return await asyncpgsa.create_pool(
-            str(dsn), **self.pool_factory_kwargs,
+            str(dsn), **self.pool_factory_kwargs_for(dsn),
         )
 
 
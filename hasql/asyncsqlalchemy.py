@@ -1,11 +1,12 @@
 import asyncio
 from contextlib import _AsyncGeneratorContextManager, asynccontextmanager
+from functools import partial
 from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence, Type
 
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import NullPool, QueuePool
 
 from hasql.base import BasePoolManager, TimeoutAcquireContext
 from hasql.metrics import DriverMetrics
@@ -13,6 +14,20 @@ from hasql.utils import Dsn
 
 
 class PoolManager(BasePoolManager):
+    _pool_only_kwargs = frozenset((
+        "pool",
+        "poolclass",
+        "pool_size",
+        "max_overflow",
+        "pool_timeout",
+        "pool_recycle",
+        "pool_pre_ping",
+        "pool_use_lifo",
+        "pool_reset_on_return",
+        "pool_logging_name",
+        "echo_pool",
+    ))
+
     # TODO: _timeout is a smuggled kwarg key — consider returning a
     #  (kwargs, timeout) tuple from _prepare_acquire_kwargs instead.
     def _prepare_acquire_kwargs(
@@ -24,6 +39,13 @@ class PoolManager(BasePoolManager):
         prepared_kwargs["_timeout"] = timeout
         return prepared_kwargs
 
+    def _is_connection_error(self, error: Exception) -> bool:
+        if isinstance(error, sa.exc.DBAPIError):
+            return error.connection_invalidated or isinstance(
+                error, (sa.exc.OperationalError, sa.exc.InterfaceError),
+            )
+        return super()._is_connection_error(error)
+
     def get_pool_freesize(self, pool: AsyncEngine):
         queue_pool: QueuePool = pool.sync_engine.pool
         return queue_pool.size() - queue_pool.checkedout()
@@ -32,7 +54,12 @@ class PoolManager(BasePoolManager):
         timeout = kwargs.pop("_timeout", None)
         ctx = pool.connect()
         if timeout is not None:
-            return TimeoutAcquireContext(ctx, timeout)
+            return TimeoutAcquireContext(
+                ctx,
+                timeout,
+                release_timeout=self.release_timeout,
+                on_release_timeout=partial(self._reap_release, pool),
+            )
         return ctx
 
     async def release_to_pool(      # type: ignore
@@ -43,21 +70,31 @@ class PoolManager(BasePoolManager):
     ):
         await connection.close()
 
-    async def _is_master(self, connection: AsyncConnection):
-        result = await connection.scalar(
-            sa.text("SHOW transaction_read_only"),
-        ) == "off"
+    async def _terminate_connection(self, connection: AsyncConnection):
+        # The pool discards an invalidated connection instead of reusing it
+        await connection.invalidate()
+
+    async def _fetchrow(self, connection: AsyncConnection, query: str):
+        result = await connection.execute(sa.text(query))
+        return result.first()
+
+    async def _fetch_host_status(
+        self, connection: AsyncConnection, query: str,
+    ):
+        row = await self._fetchrow(connection, query)
         await connection.execute(sa.text('COMMIT'))
-        return result
+        return row
 
     async def _pool_factory(self, dsn: Dsn):
         d = str(dsn)
         if d.startswith('postgresql://'):
             d = d.replace('postgresql://', 'postgresql+asyncpg://', 1)
-        return create_async_engine(d, **self.pool_factory_kwargs)
+        return create_async_engine(d, **self.pool_factory_kwargs_for(dsn))
 
     def _prepare_pool_factory_kwargs(self, kwargs: dict) -> dict:
-        kwargs["pool_size"] = kwargs.get("pool_size", 1) + 1
+        kwargs["pool_size"] = (
+            kwargs.get("pool_size", 1) + self._pool_reserved_size
+        )
         return kwargs
 
     async def _close(self, pool: AsyncEngine):
@@ -70,6 +107,17 @@ class PoolManager(BasePoolManager):
     def is_connection_closed(self, connection: AsyncConnection):
         return connection.closed
 
+    async def _connect_probe(self, pool: AsyncEngine, dsn: Dsn):
+        # The engine of the pool would count the probe as its connection
+        engine = create_async_engine(
+            pool.url, poolclass=NullPool, **self._probe_connect_kwargs(),
+        )
+        return await engine.connect()
+
+    async def _close_probe(self, connection: AsyncConnection):
+        await connection.close()
+        await connection.engine.dispose()
+
     def host(self, pool: AsyncEngine):
         return pool.sync_engine.url.host
 
@@ -1,10 +1,14 @@
+from .ewma import EwmaBalancerPolicy
 from .greedy import GreedyBalancerPolicy
+from .power_of_two_choices import PowerOfTwoChoicesBalancerPolicy
 from .random_weighted import RandomWeightedBalancerPolicy
 from .round_robin import RoundRobinBalancerPolicy
 
 
 __all__ = (
+    "EwmaBalancerPolicy",
     "GreedyBalancerPolicy",
+    "PowerOfTwoChoicesBalancerPolicy",
     "RandomWeightedBalancerPolicy",
     "RoundRobinBalancerPolicy",
 )
@@ -1,6 +1,6 @@
 import random
 from abc import abstractmethod
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence
 
 from ..base import AbstractBalancerPolicy, BasePoolManager
 
@@ -14,6 +14,8 @@ class BaseBalancerPolicy(AbstractBalancerPolicy):
         read_only: bool,
         fallback_master: bool = False,
         master_as_replica_weight: Optional[float] = None,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
     ) -> Any:
         if not read_only and master_as_replica_weight is not None:
             raise ValueError(
@@ -21,16 +23,156 @@ class BaseBalancerPolicy(AbstractBalancerPolicy):
                 "read_only is True",
             )
 
-        choose_master_as_replica = False
-        if master_as_replica_weight is not None:
-            rand = random.random()
-            choose_master_as_replica = 0 < rand <= master_as_replica_weight
+        choose_master_as_replica = self._choose_master_as_replica(
+            master_as_replica_weight,
+        )
+
+        while True:
+            pool = await self._get_pool(
+                read_only=read_only,
+                fallback_master=fallback_master or choose_master_as_replica,
+                choose_master_as_replica=choose_master_as_replica,
+                max_lag=max_lag,
+                min_lsn=min_lsn,
+            )
+            # No pool means the candidates have gone between the wakeup
+            # and the choice, e.g. quarantined or ejected, so the next
+            # call waits for them again
+            if pool is not None:
+                return pool
 
-        return await self._get_pool(
+    def try_get_pool(
+        self,
+        read_only: bool,
+        fallback_master: bool = False,
+        master_as_replica_weight: Optional[float] = None,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ) -> Any:
+        if not read_only and master_as_replica_weight is not None:
+            raise ValueError(
+                "Field master_as_replica_weight is used only when "
+                "read_only is True",
+            )
+
+        return self._try_get_pool(
+            read_only=read_only,
+            choose_master_as_replica=self._choose_master_as_replica(
+                master_as_replica_weight,
+            ),
+            max_lag=max_lag,
+            min_lsn=min_lsn,
+        )
+
+    @staticmethod
+    def _choose_master_as_replica(
+        master_as_replica_weight: Optional[float],
+    ) -> bool:
+        if master_as_replica_weight is None:
+            return False
+        rand = random.random()
+        return 0 < rand <= master_as_replica_weight
+
+    def _try_get_pool(
+        self,
+        read_only: bool,
+        choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ) -> Any:
+        candidates = self._get_ready_candidates(
             read_only=read_only,
-            fallback_master=fallback_master or choose_master_as_replica,
             choose_master_as_replica=choose_master_as_replica,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
         )
+        if not candidates:
+            return None
+        return self._choose_pool(self._skip_saturated(candidates))
+
+    def _choose_pool(self, candidates: Sequence[Any]) -> Any:
+        """Synchronously choose one of the candidates, None when there
+        are none.
+
+        Returning None always disables the non-waiting path of the policy,
+        so get_pool() is always used.
+        """
+        return None
+
+    def _skip_saturated(self, candidates: Sequence[Any]) -> Sequence[Any]:
+        """Drops pools without free connections which already have queued
+        acquires, unless every candidate is such a pool."""
+        if len(candidates) == 1:
+            return candidates
+        unsaturated = [
+            pool for pool in candidates
+            if not self._pool_manager.pool_is_saturated(pool)
+        ]
+        if not unsaturated or len(unsaturated) == len(candidates):
+            return candidates
+        return unsaturated
+
+    def _get_ready_candidates(
+        self,
+        read_only: bool,
+        choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ) -> Sequence[Any]:
+        candidates: Sequence[Any]
+        if not read_only:
+            candidates = self._pool_manager.master_pools
+        elif choose_master_as_replica:
+            candidates = self._pool_manager.available_pools
+        else:
+            candidates = self._pool_manager.replica_pools
+
+        if max_lag is None and min_lsn is None:
+            return candidates
+
+        return [
+            pool for pool in candidates
+            if self._pool_manager.pool_fits_max_lag(pool, max_lag) and
+            self._pool_manager.pool_fits_min_lsn(pool, min_lsn)
+        ]
+
+    async def _get_candidates(
+        self,
+        read_only: bool,
+        fallback_master: bool = False,
+        choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ) -> Sequence[Any]:
+        if max_lag is None and min_lsn is None:
+            ready_candidates = self._get_ready_candidates(
+                read_only=read_only,
+                choose_master_as_replica=choose_master_as_replica,
+            )
+            if ready_candidates:
+                return ready_candidates
+
+        candidates: List[Any] = []
+
+        if read_only:
+            candidates.extend(
+                await self._pool_manager.get_replica_pools(
+                    fallback_master=fallback_master,
+                    max_lag=max_lag,
+                    min_lsn=min_lsn,
+                ),
+            )
+
+        if (
+                not read_only or
+                (
+                    choose_master_as_replica and
+                    self._pool_manager.master_pool_count > 0
+                )
+        ):
+            candidates.extend(await self._pool_manager.get_master_pools())
+
+        return candidates
 
     @abstractmethod
     async def _get_pool(
@@ -38,6 +180,8 @@ class BaseBalancerPolicy(AbstractBalancerPolicy):
         read_only: bool,
         fallback_master: bool = False,
         choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
     ):
         pass
 
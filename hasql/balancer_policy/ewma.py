@@ -0,0 +1,65 @@
+import random
+from typing import Any, List, Optional, Sequence
+
+from hasql.balancer_policy.base import BaseBalancerPolicy
+
+
+MACHINE_EPSILON: float = 1e-16
+
+
+class EwmaBalancerPolicy(BaseBalancerPolicy):
+    async def _get_pool(
+        self,
+        read_only: bool,
+        fallback_master: bool = False,
+        choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ):
+        candidates = await self._get_candidates(
+            read_only=read_only,
+            fallback_master=fallback_master,
+            choose_master_as_replica=choose_master_as_replica,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
+        )
+        return self._choose_pool(self._skip_saturated(candidates))
+
+    def _choose_pool(self, candidates: Sequence[Any]) -> Any:
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        return random.choices(
+            candidates,
+            weights=self._get_weights(candidates),
+        )[0]
+
+    def _get_cost(self, pool) -> Optional[float]:
+        acquire_time = self._pool_manager.get_pool_acquire_time(pool)
+        hold_time = self._pool_manager.get_pool_hold_time(pool)
+        if acquire_time is None and hold_time is None:
+            return None
+        return (acquire_time or 0) + (hold_time or 0)
+
+    def _get_weights(self, pools: Sequence[Any]) -> List[float]:
+        costs = [self._get_cost(pool) for pool in pools]
+
+        # Pools without samples yet are treated as average ones,
+        # so they are neither flooded nor starved
+        known_costs = [cost for cost in costs if cost is not None]
+        default_cost = (
+            sum(known_costs) / len(known_costs) if known_costs else 1.0
+        )
+
+        return [
+            1 / (
+                (self._pool_manager.get_pool_inflight(pool) + 1) *
+                ((default_cost if cost is None else cost) + MACHINE_EPSILON)
+            )
+            for pool, cost in zip(pools, costs)
+        ]
+
+
+__all__ = ("EwmaBalancerPolicy",)
@@ -1,4 +1,5 @@
 import random
+from typing import Any, Optional, Sequence
 
 from hasql.balancer_policy.base import BaseBalancerPolicy
 
@@ -9,32 +10,37 @@ class GreedyBalancerPolicy(BaseBalancerPolicy):
         read_only: bool,
         fallback_master: bool = False,
         choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
     ):
-        candidates = []
-
-        if read_only:
-            candidates.extend(
-                await self._pool_manager.get_replica_pools(
-                    fallback_master=fallback_master,
-                ),
-            )
-
-        if (
-                not read_only or
-                (
-                    choose_master_as_replica and
-                    self._pool_manager.master_pool_count > 0
-                )
-        ):
-            candidates.extend(await self._pool_manager.get_master_pools())
-
-        fat_pool = max(candidates, key=self._pool_manager.get_pool_freesize)
-        max_freesize = self._pool_manager.get_pool_freesize(fat_pool)
-        return random.choice([
-            candidate
-            for candidate in candidates
-            if self._pool_manager.get_pool_freesize(candidate) == max_freesize
-        ])
+        candidates = await self._get_candidates(
+            read_only=read_only,
+            fallback_master=fallback_master,
+            choose_master_as_replica=choose_master_as_replica,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
+        )
+        return self._choose_pool(candidates)
+
+    def _skip_saturated(self, candidates: Sequence[Any]) -> Sequence[Any]:
+        # The least loaded pool is never a saturated one unless all are
+        return candidates
+
+    def _choose_pool(self, candidates: Sequence[Any]) -> Any:
+        if not candidates:
+            return None
+        # Load is the number of queued acquires minus free connections,
+        # so pools with waiters lose to idle ones of the same free size
+        min_load: Optional[int] = None
+        fat_pools = []
+        for candidate in candidates:
+            load = self._pool_manager.get_pool_load(candidate)
+            if min_load is None or load < min_load:
+                min_load = load
+                fat_pools = [candidate]
+            elif load == min_load:
+                fat_pools.append(candidate)
+        return random.choice(fat_pools)
 
 
 __all__ = ("GreedyBalancerPolicy",)
@@ -0,0 +1,47 @@
+import random
+from typing import Any, Optional, Sequence
+
+from hasql.balancer_policy.base import BaseBalancerPolicy
+
+
+class PowerOfTwoChoicesBalancerPolicy(BaseBalancerPolicy):
+    async def _get_pool(
+        self,
+        read_only: bool,
+        fallback_master: bool = False,
+        choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ):
+        candidates = await self._get_candidates(
+            read_only=read_only,
+            fallback_master=fallback_master,
+            choose_master_as_replica=choose_master_as_replica,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
+        )
+        return self._choose_pool(self._skip_saturated(candidates))
+
+    def _choose_pool(self, candidates: Sequence[Any]) -> Any:
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        # Two distinct random indexes without building a sample list
+        first_index = random.randrange(len(candidates))
+        second_index = random.randrange(len(candidates) - 1)
+        if second_index >= first_index:
+            second_index += 1
+
+        first = candidates[first_index]
+        second = candidates[second_index]
+        if (
+            self._pool_manager.get_pool_inflight(second) <
+            self._pool_manager.get_pool_inflight(first)
+        ):
+            return second
+        return first
+
+
+__all__ = ("PowerOfTwoChoicesBalancerPolicy",)
@@ -1,5 +1,5 @@
 import random
-from typing import Iterable, Optional
+from typing import Any, Iterable, Optional, Sequence
 
 from hasql.balancer_policy.base import BaseBalancerPolicy
 
@@ -8,29 +8,30 @@ MACHINE_EPSILON: float = 1e-16
 
 
 class RandomWeightedBalancerPolicy(BaseBalancerPolicy):
+    # Percentile of the host check response times used as the pool weight,
+    # override in a subclass to balance by tail latency instead of median
+    response_time_percentile: float = 0.5
+
     async def _get_pool(
         self,
         read_only: bool,
         fallback_master: bool = False,
         choose_master_as_replica: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
     ):
-        candidates = []
-
-        if read_only:
-            candidates.extend(
-                await self._pool_manager.get_replica_pools(
-                    fallback_master=fallback_master,
-                ),
-            )
-        if (
-                not read_only or
-                (
-                    choose_master_as_replica and
-                    self._pool_manager.master_pool_count > 0
-                )
-        ):
-            candidates.extend(await self._pool_manager.get_master_pools())
+        candidates = await self._get_candidates(
+            read_only=read_only,
+            fallback_master=fallback_master,
+            choose_master_as_replica=choose_master_as_replica,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
+        )
+        return self._choose_pool(self._skip_saturated(candidates))
 
+    def _choose_pool(self, candidates: Sequence[Any]) -> Any:
+        if not candidates:
+            return None
         choiced_index = self._weighted_choice(
             self._normalize_times(
                 self._reflect_times(
@@ -41,9 +42,14 @@ class RandomWeightedBalancerPolicy(BaseBalancerPolicy):
 
         return candidates[choiced_index]
 
-    def _get_response_times(self, pools: list) -> Iterable[Optional[float]]:
+    def _get_response_times(
+        self,
+        pools: Sequence[Any],
+    ) -> Iterable[Optional[float]]:
         for pool in pools:
-            yield self._pool_manager.get_last_response_time(pool)
+            yield self._pool_manager.get_last_response_time(
+                pool, self.response_time_percentile,
+            )
 
     @staticmethod
     def _reflect_times(
@@ -1,6 +1,6 @@
 from collections import defaultdict
 from types import MappingProxyType
-from typing import NamedTuple, Optional
+from typing import Any, NamedTuple, Optional, Sequence
 
 from hasql.balancer_policy.base import BaseBalancerPolicy
 
@@ -14,10 +14,10 @@ class RoundRobinBalancerPolicy(BaseBalancerPolicy):
     def __init__(self, pool_manager):
         super().__init__(pool_manager)
         self._indexes = defaultdict(lambda: 0)
-        self._choose_predicates = MappingProxyType({
-            PoolOptions(True, False): self._replica_predicate,
-            PoolOptions(True, True): self._master_as_replica_predicate,
-            PoolOptions(False, False): self._master_predicate,
+        self._choose_candidates = MappingProxyType({
+            PoolOptions(True, False): self._replica_candidates,
+            PoolOptions(True, True): self._master_as_replica_candidates,
+            PoolOptions(False, False): self._master_candidates,
         })
 
     async def _get_pool(
@@ -25,42 +25,86 @@ class RoundRobinBalancerPolicy(BaseBalancerPolicy):
             read_only: bool,
             fallback_master: Optional[bool] = None,
             choose_master_as_replica: bool = False,
+            max_lag: Optional[float] = None,
+            min_lsn: Optional[int] = None,
     ):
         if read_only:
-            if self._pool_manager.replica_pool_count == 0:
+            if max_lag is not None or min_lsn is not None:
+                candidates = await self._pool_manager.get_replica_pools(
+                    fallback_master=bool(fallback_master),
+                    max_lag=max_lag,
+                    min_lsn=min_lsn,
+                )
+                if not any(map(self._pool_manager.pool_is_replica, candidates)):
+                    read_only = False
+                    choose_master_as_replica = False
+            elif not self._pool_manager.replica_pools:
+                # Candidates are taken from the same tuples, the replica set
+                # also counts replicas ejected as outliers
                 if fallback_master:
                     read_only = False
                     choose_master_as_replica = False
-                    if self._pool_manager.master_pool_count == 0:
-                        await self._pool_manager.wait_masters_ready(1)
+                    await self._pool_manager.get_master_pools()
                 else:
-                    await self._pool_manager.wait_replicas_ready(1)
+                    await self._pool_manager.get_replica_pools()
         else:
-            if self._pool_manager.master_pool_count == 0:
-                await self._pool_manager.wait_masters_ready(1)
+            await self._pool_manager.get_master_pools()
 
+        return self._try_get_pool(
+            read_only=read_only,
+            choose_master_as_replica=choose_master_as_replica,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
+        )
+
+    def _try_get_pool(
+            self,
+            read_only: bool,
+            choose_master_as_replica: bool = False,
+            max_lag: Optional[float] = None,
+            min_lsn: Optional[int] = None,
+    ):
         pool_options = PoolOptions(read_only, choose_master_as_replica)
-        assert pool_options in self._choose_predicates
+        assert pool_options in self._choose_candidates
 
-        predicate = self._choose_predicates[pool_options]
+        candidates = self._choose_candidates[pool_options]()
         start_index = self._indexes[pool_options]
 
-        pools = self._pool_manager.pools
-        for offset in range(len(pools)):
-            index = (start_index + offset) % len(pools)
-            current_pool = pools[index]
-            if current_pool is not None and predicate(current_pool):
-                self._indexes[pool_options] = (index + 1) % len(pools)
-                return current_pool
+        # Saturated pools are skipped in turn and used only when every
+        # fitting candidate is saturated. Without max_lag and min_lsn the
+        # first candidate fits, so it usually ends the loop.
+        saturated_index = None
+        for offset in range(len(candidates)):
+            index = (start_index + offset) % len(candidates)
+            current_pool = candidates[index]
+            if not (
+                self._pool_manager.pool_fits_max_lag(current_pool, max_lag) and
+                self._pool_manager.pool_fits_min_lsn(current_pool, min_lsn)
+            ):
+                continue
+            if (
+                len(candidates) > 1 and
+                self._pool_manager.pool_is_saturated(current_pool)
+            ):
+                if saturated_index is None:
+                    saturated_index = index
+                continue
+            self._indexes[pool_options] = (index + 1) % len(candidates)
+            return current_pool
+
+        if saturated_index is None:
+            return None
+        self._indexes[pool_options] = (saturated_index + 1) % len(candidates)
+        return candidates[saturated_index]
 
-    def _master_predicate(self, pool) -> bool:
-        return self._pool_manager.pool_is_master(pool)
+    def _master_candidates(self) -> Sequence[Any]:
+        return self._pool_manager.master_pools
 
-    def _replica_predicate(self, pool) -> bool:
-        return self._pool_manager.pool_is_replica(pool)
+    def _replica_candidates(self) -> Sequence[Any]:
+        return self._pool_manager.replica_pools
 
-    def _master_as_replica_predicate(self, pool) -> bool:
-        return self._master_predicate(pool) or self._replica_predicate(pool)
+    def _master_as_replica_candidates(self) -> Sequence[Any]:
+        return self._pool_manager.available_pools
 
 
 __all__ = ("RoundRobinBalancerPolicy",)
@@ -1,49 +1,120 @@
 import asyncio
 import logging
+import sys
+import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from contextlib import nullcontext
+from functools import partial
 from itertools import chain
 from types import MappingProxyType
 from typing import (
+    AbstractSet,
     Any,
     AsyncContextManager,
+    Callable,
     DefaultDict,
     Dict,
+    Iterable,
     List,
+    Mapping,
     Optional,
     Sequence,
     Set,
+    Tuple,
     Union,
 )
 
-from .metrics import CalculateMetrics, DriverMetrics, Metrics
-from .utils import Dsn, Stopwatch, split_dsn
+from .metrics import NO_HOST, CalculateMetrics, DriverMetrics, Metrics
+from .outlier_detection import OutlierDetection, OutlierDetector
+from .refresh_scheduler import (
+    AbstractRefreshScheduler,
+    AdaptiveRefreshScheduler,
+)
+from .shared_topology import SharedTopology
+from .topology import HostStatus, TopologyMonitor
+from .utils import (
+    Dsn,
+    Ewma,
+    SlidingWindow,
+    Stopwatch,
+    parse_lsn,
+    split_dsn,
+)
 
 logger = logging.getLogger(__name__)
 
 
+if sys.version_info >= (3, 11):
+    async def wait_for(aw, timeout: float):
+        # Unlike asyncio.wait_for prior to 3.12 it does not wrap the
+        # awaitable into a separate task
+        async with asyncio.timeout(timeout):
+            return await aw
+else:
+    wait_for = asyncio.wait_for
+
+
+class PoolManagerClosingError(RuntimeError):
+    """Raised by acquires started after ``close()`` has been called."""
+
+
 class TimeoutAcquireContext:
-    __slots__ = ("_context", "_timeout")
+    """Bounds the acquire of a driver context manager by ``timeout``.
+
+    With ``release_timeout`` the release is bounded as well: a release which
+    has not completed in time keeps running in background and is handed to
+    ``on_release_timeout`` together with the connection, so that the caller
+    returns promptly and the connection is terminated instead of leaked.
+    """
 
-    def __init__(self, context, timeout: float):
+    __slots__ = (
+        "_context", "_timeout", "_release_timeout", "_on_release_timeout",
+        "_connection",
+    )
+
+    def __init__(
+        self,
+        context,
+        timeout: float,
+        release_timeout: Optional[float] = None,
+        on_release_timeout: Optional[
+            Callable[["asyncio.Future[Any]", Any], None]
+        ] = None,
+    ):
         self._context = context
         self._timeout = timeout
+        self._release_timeout = release_timeout
+        self._on_release_timeout = on_release_timeout
+        self._connection: Any = None
 
     async def __aenter__(self):
-        return await asyncio.wait_for(
+        self._connection = await wait_for(
             self._context.__aenter__(),
             timeout=self._timeout,
         )
+        return self._connection
 
     async def __aexit__(self, *exc):
-        # TODO: consider adding a bounded timeout here. Currently if the
-        #  underlying driver hangs during connection release this will block
-        #  indefinitely. A timeout risks leaking the connection (not returned
-        #  to pool), so this needs careful design.
-        await self._context.__aexit__(*exc)
+        if self._release_timeout is None or self._on_release_timeout is None:
+            await self._context.__aexit__(*exc)
+            return
+
+        release = asyncio.ensure_future(self._context.__aexit__(*exc))
+        try:
+            done, _ = await asyncio.wait(
+                {release}, timeout=self._release_timeout,
+            )
+        except asyncio.CancelledError:
+            self._on_release_timeout(release, self._connection)
+            raise
+        if not done:
+            self._on_release_timeout(release, self._connection)
+            return
+        release.result()
 
     def __await__(self):
-        return asyncio.wait_for(
+        return wait_for(
             self._context.__aenter__(),
             timeout=self._timeout,
         ).__await__()
@@ -54,6 +125,48 @@ DEFAULT_REFRESH_TIMEOUT: int = 30
 DEFAULT_ACQUIRE_TIMEOUT: float = 1.0
 DEFAULT_MASTER_AS_REPLICA_WEIGHT: float = 0.0
 DEFAULT_STOPWATCH_WINDOW_SIZE: int = 128
+DEFAULT_EWMA_DECAY_TIME: float = 10.0
+DEFAULT_PROBE_TIMEOUT: float = 5.0
+
+# Connections opened by a pool at creation while the startup is throttled
+# with startup_concurrency: the system connection and one for the application
+STARTUP_POOL_MIN_SIZE: int = 2
+
+# Connections opened by a pool of a host listed in lazy_hosts until
+# a balancer selects it for the first time: the system connection only,
+# none with dedicated_probe
+LAZY_POOL_MIN_SIZE: int = 1
+
+# Passed as hedge_after to hedge an acquire after the given percentile of
+# the recent acquire times of all replicas
+HEDGE_AFTER_AUTO: str = "auto"
+HEDGE_AFTER_AUTO_PERCENTILE: float = 0.95
+
+# Share of the acquire timeout which must be left to the driver pool for its
+# timeout to quarantine the host. The balancer may spend most of the timeout
+# waiting for a host during a failover, and the few milliseconds left are
+# not enough for a healthy pool to open a connection.
+MIN_QUARANTINE_ACQUIRE_BUDGET: float = 0.5
+
+# Everything a check needs in one round trip: transaction_read_only (the
+# role), recovery state, replication lag and replay LSN, and the number of
+# backends of the database. clock_timestamp() instead of now(): the system
+# connection may stay inside a transaction between checks, and now() is
+# frozen within a transaction. The expression passed as probe_expression
+# is appended as the last column.
+HOST_STATUS_QUERY: str = (
+    "SELECT current_setting('transaction_read_only'), "
+    "pg_is_in_recovery(), "
+    "CASE "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM "
+    "clock_timestamp() - pg_last_xact_replay_timestamp()) "
+    "END, "
+    "pg_last_wal_replay_lsn()::text, "
+    "(SELECT numbackends FROM pg_stat_database "
+    "WHERE datname = current_database())"
+)
+CURRENT_LSN_QUERY: str = "SELECT pg_current_wal_lsn()::text"
 
 
 class AbstractBalancerPolicy(ABC):
@@ -66,9 +179,26 @@ class AbstractBalancerPolicy(ABC):
         read_only: bool,
         fallback_master: bool = False,
         master_as_replica_weight: Optional[float] = None,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
     ) -> Any:
         raise NotImplementedError
 
+    def try_get_pool(
+        self,
+        read_only: bool,
+        fallback_master: bool = False,
+        master_as_replica_weight: Optional[float] = None,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ) -> Any:
+        """Choose a pool without waiting.
+
+        Returns None when no candidate is available right now, the caller
+        then waits for one with get_pool().
+        """
+        return None
+
 
 class PoolAcquireContext(AsyncContextManager):
     def __init__(
@@ -79,11 +209,15 @@ class PoolAcquireContext(AsyncContextManager):
         timeout: float,
         metrics: CalculateMetrics,
         fallback_master: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
         **kwargs,
     ):
         self.pool_manager = pool_manager
         self.read_only = read_only
         self.fallback_master = fallback_master
+        self.max_lag = max_lag
+        self.min_lsn = min_lsn
         self.master_as_replica_weight = master_as_replica_weight
         self.timeout = timeout
         self.kwargs = kwargs
@@ -104,72 +238,304 @@ class PoolAcquireContext(AsyncContextManager):
     #  self.pool) and extract the shared preamble between __aenter__ /
     #  acquire_from_pool_connection into a helper.
     async def _get_pool(self, deadline: float):
-        async def get_pool() -> Any:
+        if self.pool_manager.closing or self.pool_manager.closed:
+            raise PoolManagerClosingError("Pool manager is closing")
+        balancer = self.pool_manager.balancer
+        started_at = time.monotonic()
+        try:
             with self.metrics.with_get_pool():
-                return await self.pool_manager.balancer.get_pool(
+                # A healthy candidate usually exists, so try to choose it
+                # without suspending before paying for a waiting get_pool()
+                self.pool = balancer.try_get_pool(
                     read_only=self.read_only,
                     fallback_master=self.fallback_master,
                     master_as_replica_weight=self.master_as_replica_weight,
+                    max_lag=self.max_lag,
+                    min_lsn=self.min_lsn,
                 )
-
-        self.pool = await asyncio.wait_for(
-            get_pool(),
-            timeout=self._remaining_timeout(deadline),
-        )
+                if self.pool is None:
+                    self.pool = await wait_for(
+                        balancer.get_pool(
+                            read_only=self.read_only,
+                            fallback_master=self.fallback_master,
+                            master_as_replica_weight=(
+                                self.master_as_replica_weight
+                            ),
+                            max_lag=self.max_lag,
+                            min_lsn=self.min_lsn,
+                        ),
+                        timeout=self._remaining_timeout(deadline),
+                    )
+        finally:
+            # Waits which ended without a pool, e.g. timed out during
+            # a failover, are recorded under NO_HOST
+            self.metrics.add_get_pool_time(
+                NO_HOST if self.pool is None
+                else self.pool_manager.host(self.pool),
+                time.monotonic() - started_at,
+            )
         return self.pool
 
-    def _acquire_kwargs(self, deadline: float) -> dict:
+    def _acquire_kwargs(self, timeout: float) -> dict:
         return self.pool_manager._prepare_acquire_kwargs(
             self.kwargs,
-            timeout=self._remaining_timeout(deadline),
+            timeout=timeout,
         )
 
-    async def _resolve_pool_and_kwargs(self):
+    async def _resolve_pool_and_deadline(self) -> float:
         deadline = self._deadline()
         await self._get_pool(deadline)
-        return self._acquire_kwargs(deadline)
-
-    async def acquire_from_pool_connection(self):
-        acquire_kwargs = await self._resolve_pool_and_kwargs()
-
-        with self.metrics.with_acquire(self.pool_manager.host(self.pool)):
-            self.conn = await self.pool_manager.acquire_from_pool(
-                self.pool,
-                **acquire_kwargs,
-            )
+        return deadline
 
+    async def _acquire_connection(
+        self,
+        pool,
+        deadline: float,
+        managed: bool,
+    ) -> Tuple[Any, Any]:
+        """Acquires a connection from the given pool and returns the driver
+        acquire context (None for unmanaged acquires) and the connection."""
+        timeout = self._remaining_timeout(deadline)
+        acquire_kwargs = self._acquire_kwargs(timeout)
+        self.pool_manager._materialize_pool(pool)
+        self.pool_manager._add_inflight(pool)
+        started_at = time.monotonic()
+        try:
+            with self.metrics.with_acquire(self.pool_manager.host(pool)):
+                if managed:
+                    context = self.pool_manager.acquire_from_pool(
+                        pool,
+                        **acquire_kwargs,
+                    )
+                    connection = await context.__aenter__()
+                else:
+                    context = None
+                    connection = await self.pool_manager.acquire_from_pool(
+                        pool,
+                        **acquire_kwargs,
+                    )
+        except Exception as e:
+            self._acquire_failed(pool, started_at, timeout, e)
+            raise
+        except BaseException:
+            self.pool_manager._remove_inflight(pool)
+            raise
+
+        elapsed = time.monotonic() - started_at
+        self.pool_manager._add_acquire_time(pool, elapsed)
+        if self.read_only:
+            self.pool_manager._add_replica_acquire_time(pool, elapsed)
+        return context, connection
+
+    def _acquired(self):
+        self.pool_manager._add_held(self.pool)
         self.metrics.add_connection(self.pool_manager.host(self.pool))
+
+    async def acquire_from_pool_connection(self):
+        deadline = await self._resolve_pool_and_deadline()
+        _, self.conn = await self._acquire_connection(
+            self.pool, deadline, managed=False,
+        )
+        self._acquired()
         self.pool_manager.register_connection(self.conn, self.pool)
         return self.conn
 
     async def __aenter__(self):
-        acquire_kwargs = await self._resolve_pool_and_kwargs()
-
-        with self.metrics.with_acquire(self.pool_manager.host(self.pool)):
-            self.context = self.pool_manager.acquire_from_pool(
-                self.pool,
-                **acquire_kwargs,
-            )
-            self.conn = await self.context.__aenter__()
-
-        self.metrics.add_connection(self.pool_manager.host(self.pool))
+        deadline = await self._resolve_pool_and_deadline()
+        self.context, self.conn = await self._acquire_connection(
+            self.pool, deadline, managed=True,
+        )
+        self.acquired_at = time.monotonic()
+        self._acquired()
         return self.conn
 
     async def __aexit__(self, *exc):
         self.metrics.remove_connection(self.pool_manager.host(self.pool))
-        await self.context.__aexit__(*exc)
+        self.pool_manager._remove_held(self.pool)
+        self.pool_manager._add_hold_time(
+            self.pool, time.monotonic() - self.acquired_at,
+        )
+        # The connection stays in flight until the driver has taken it
+        # back, so a draining close() does not close the pool under it
+        try:
+            await self.context.__aexit__(*exc)
+        finally:
+            self.pool_manager._remove_inflight(self.pool)
         del self.conn
 
+    def _acquire_failed(
+        self, pool, started_at: float, timeout: float, error: Exception,
+    ):
+        # A failed or timed out acquire is a latency sample as well,
+        # otherwise a pool which never returns connections looks idle
+        self.pool_manager._remove_inflight(pool)
+        self.pool_manager._add_acquire_time(
+            pool, time.monotonic() - started_at,
+        )
+        self.pool_manager._handle_acquire_error(
+            pool, error, budget=timeout / self.timeout,
+        )
+
     def __await__(self):
         return self.acquire_from_pool_connection().__await__()
 
 
+class HedgedPoolAcquireContext(PoolAcquireContext):
+    """Starts a second acquire on another replica when the first one has
+    not completed within ``hedge_after`` seconds. The first connection
+    acquired is returned, the other acquire is cancelled or its connection
+    is released back to the pool. Both acquires share the deadline of the
+    context."""
+
+    def __init__(
+        self,
+        *args,
+        hedge_after: Union[float, str],
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.hedge_after = hedge_after
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_after == HEDGE_AFTER_AUTO:
+            return self.pool_manager.get_replica_acquire_time(
+                HEDGE_AFTER_AUTO_PERCENTILE,
+            )
+        return float(self.hedge_after)
+
+    def _get_hedge_pool(self):
+        # Balancer policies are unable to exclude a pool, so the least
+        # loaded replica is chosen among the others
+        pool_manager = self.pool_manager
+        candidates = [
+            pool for pool in pool_manager.replica_pools
+            if pool is not self.pool and
+            pool_manager.pool_fits_max_lag(pool, self.max_lag) and
+            pool_manager.pool_fits_min_lsn(pool, self.min_lsn)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=pool_manager.get_pool_load)
+
+    async def _release_loser(self, pool, context, connection):
+        try:
+            if context is not None:
+                await context.__aexit__(None, None, None)
+            else:
+                await self.pool_manager.release_to_pool(connection, pool)
+        finally:
+            self.pool_manager._remove_inflight(pool)
+
+    async def _hedged_acquire(self, managed: bool):
+        deadline = self._deadline()
+        await self._get_pool(deadline)
+        attempts: Dict[asyncio.Future, Any] = {
+            asyncio.ensure_future(
+                self._acquire_connection(self.pool, deadline, managed),
+            ): self.pool,
+        }
+        winner: Optional[asyncio.Future] = None
+        try:
+            hedge_delay = self._hedge_delay()
+            pending = set(attempts)
+            if hedge_delay is not None:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=min(
+                        hedge_delay, self._remaining_timeout(deadline),
+                    ),
+                )
+                hedge_pool = None if done else self._get_hedge_pool()
+                if hedge_pool is not None:
+                    self.metrics.add_hedge(self.pool_manager.host(hedge_pool))
+                    hedge = asyncio.ensure_future(
+                        self._acquire_connection(
+                            hedge_pool, deadline, managed,
+                        ),
+                    )
+                    attempts[hedge] = hedge_pool
+                    pending.add(hedge)
+                pending |= done
+
+            while winner is None:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self._remaining_timeout(deadline),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    raise asyncio.TimeoutError
+                for attempt in attempts:
+                    if attempt in done and attempt.exception() is None:
+                        winner = attempt
+                        break
+                else:
+                    if not pending:
+                        # Every attempt has failed, the error of the
+                        # first one is the most relevant
+                        for attempt in attempts:
+                            attempt.result()
+        finally:
+            await self._cancel_losers(attempts, winner)
+
+        self.pool = attempts[winner]
+        return winner.result()
+
+    async def _cancel_losers(
+        self,
+        attempts: Dict[asyncio.Future, Any],
+        winner: Optional[asyncio.Future],
+    ):
+        losers = [attempt for attempt in attempts if attempt is not winner]
+        for attempt in losers:
+            attempt.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
+        for attempt in losers:
+            if attempt.cancelled() or attempt.exception() is not None:
+                continue
+            # The acquire has completed before it has been cancelled
+            context, connection = attempt.result()
+            await self._release_loser(attempts[attempt], context, connection)
+
+    async def acquire_from_pool_connection(self):
+        _, self.conn = await self._hedged_acquire(managed=False)
+        self._acquired()
+        self.pool_manager.register_connection(self.conn, self.pool)
+        return self.conn
+
+    async def __aenter__(self):
+        self.context, self.conn = await self._hedged_acquire(managed=True)
+        self.acquired_at = time.monotonic()
+        self._acquired()
+        return self.conn
+
+
 class BasePoolManager(ABC):
     _dsn_ready_event: DefaultDict[Dsn, asyncio.Event]
     _dsn_check_cond: DefaultDict[Dsn, asyncio.Condition]
+    _dsn_recheck_event: DefaultDict[Dsn, asyncio.Event]
     _master_pool_set: Set[Any]
     _replica_pool_set: Set[Any]
+    _master_pools: Tuple[Any, ...]
+    _replica_pools: Tuple[Any, ...]
+    _available_pools: Tuple[Any, ...]
     _unmanaged_connections: Dict[Any, Any]
+    _pool_inflight: DefaultDict[Any, int]
+    _pool_held: DefaultDict[Any, int]
+    _pool_quarantined_at: Dict[Any, float]
+    _pool_host_status: Dict[Any, HostStatus]
+
+    # Name of the pool factory argument with the number of connections
+    # opened when the pool is created. With startup_concurrency the pools
+    # are created with STARTUP_POOL_MIN_SIZE connections and the pools of
+    # lazy_hosts with LAZY_POOL_MIN_SIZE, the rest are opened in background.
+    # None disables that for the adapter.
+    _pool_min_size_kwarg: Optional[str] = None
+
+    # Pool factory arguments which configure the pool itself. The connection
+    # of dedicated_probe is opened with the rest of them, e.g. ssl options
+    # or the password.
+    _pool_only_kwargs: AbstractSet[str] = frozenset()
 
     def __init__(
         self,
@@ -182,39 +548,112 @@ class BasePoolManager(ABC):
         balancer_policy: type = AbstractBalancerPolicy,
         stopwatch_window_size: int = DEFAULT_STOPWATCH_WINDOW_SIZE,
         pool_factory_kwargs: Optional[dict] = None,
+        ewma_decay_time: float = DEFAULT_EWMA_DECAY_TIME,
+        max_refresh_delay: Optional[Union[float, int]] = None,
+        refresh_scheduler: type = AdaptiveRefreshScheduler,
+        outlier_detection: Optional[OutlierDetection] = None,
+        release_timeout: Optional[Union[float, int]] = None,
+        startup_concurrency: Optional[int] = None,
+        lazy_hosts: Optional[Iterable[str]] = None,
+        topology_monitor: Optional[TopologyMonitor] = None,
+        shared_topology: Optional[SharedTopology] = None,
+        probe_expression: Optional[str] = None,
+        dedicated_probe: bool = False,
+        probe_timeout: Union[float, int] = DEFAULT_PROBE_TIMEOUT,
     ):
         if not issubclass(balancer_policy, AbstractBalancerPolicy):
             raise ValueError(
                 "balancer_policy must be a class BaseBalancerPolicy heir",
             )
 
+        if not issubclass(refresh_scheduler, AbstractRefreshScheduler):
+            raise ValueError(
+                "refresh_scheduler must be a class "
+                "AbstractRefreshScheduler heir",
+            )
+
+        if startup_concurrency is not None and startup_concurrency < 1:
+            raise ValueError("startup_concurrency must be positive")
+
+        if max_refresh_delay is None:
+            max_refresh_delay = refresh_delay
+        if max_refresh_delay < refresh_delay:
+            raise ValueError(
+                "max_refresh_delay must not be less than refresh_delay",
+            )
+
         if balancer_policy is AbstractBalancerPolicy:
             # Avoid circular import
             from .balancer_policy.greedy import GreedyBalancerPolicy
 
             balancer_policy = GreedyBalancerPolicy
 
+        self._dedicated_probe = dedicated_probe
+        self._probe_timeout = probe_timeout
+        self._shared_topology = shared_topology
         if pool_factory_kwargs is None:
             pool_factory_kwargs = {}
         self._pool_factory_kwargs = MappingProxyType(
             self._prepare_pool_factory_kwargs(pool_factory_kwargs),
         )
+        self._startup_semaphore: Optional[asyncio.Semaphore] = None
+        self._warm_up_semaphore: Optional[asyncio.Semaphore] = None
+        if startup_concurrency is not None:
+            self._startup_semaphore = asyncio.Semaphore(startup_concurrency)
+            self._warm_up_semaphore = asyncio.Semaphore(startup_concurrency)
+        self._initial_pool_factory_kwargs = MappingProxyType(
+            self._prepare_initial_pool_factory_kwargs(),
+        )
+        self._warm_up_tasks: Set[asyncio.Task] = set()
+        self._lazy_hosts = frozenset(lazy_hosts or ())
+        self._lazy_pools: Dict[Any, Dsn] = {}
         self._dsn: List[Dsn] = split_dsn(dsn)
+        self._dsn_starting: Set[Dsn] = set(self._dsn)
+        self._startup_done = asyncio.Event()
         self._dsn_ready_event = defaultdict(asyncio.Event)
         self._dsn_check_cond = defaultdict(asyncio.Condition)
+        self._dsn_recheck_event = defaultdict(asyncio.Event)
         self._pools = [None] * len(self._dsn)
         self._acquire_timeout = acquire_timeout
         self._refresh_delay = refresh_delay
+        self._max_refresh_delay = max_refresh_delay
         self._refresh_timeout = refresh_timeout
         self._fallback_master = fallback_master
         self._master_as_replica_weight = master_as_replica_weight
         self._balancer = balancer_policy(self)
+        self._refresh_scheduler = refresh_scheduler(self)
         self._master_pool_set = set()
         self._replica_pool_set = set()
+        self._master_pools = ()
+        self._replica_pools = ()
+        self._available_pools = ()
+        self._pools_version = 0
         self._master_cond = asyncio.Condition()
         self._replica_cond = asyncio.Condition()
         self._unmanaged_connections = {}
+        self._pool_inflight = defaultdict(int)
+        self._drained: Optional[asyncio.Event] = None
+        self._pool_held = defaultdict(int)
+        self._pool_quarantined_at = {}
+        self._pool_host_status = {}
+        self._host_status_query = self._prepare_host_status_query(
+            probe_expression,
+        )
         self._stopwatch = Stopwatch(window_size=stopwatch_window_size)
+        self._replica_acquire_window = SlidingWindow(stopwatch_window_size)
+        self._acquire_time = Ewma(decay_time=ewma_decay_time)
+        self._hold_time = Ewma(decay_time=ewma_decay_time)
+        self._release_timeout = release_timeout
+        self._reaper_tasks: Set[asyncio.Task] = set()
+        self._outlier_detector: Optional[OutlierDetector] = None
+        self._outlier_detection_task: Optional[asyncio.Task] = None
+        if outlier_detection is not None:
+            self._outlier_detector = OutlierDetector(self, outlier_detection)
+            self._outlier_detection_task = asyncio.create_task(
+                self._outlier_detection(),
+            )
+        self._topology_monitor = topology_monitor
+        self._check_requests_task = self._start_serving_check_requests()
         self._refresh_role_tasks = [
             asyncio.create_task(self._check_pool_task(index))
             for index in range(len(self._dsn))
@@ -231,6 +670,14 @@ class BasePoolManager(ABC):
     def refresh_delay(self):
         return self._refresh_delay
 
+    @property
+    def max_refresh_delay(self):
+        return self._max_refresh_delay
+
+    @property
+    def release_timeout(self) -> Optional[Union[float, int]]:
+        return self._release_timeout
+
     @property
     def refresh_timeout(self):
         return self._refresh_timeout
@@ -239,6 +686,42 @@ class BasePoolManager(ABC):
     def pool_factory_kwargs(self):
         return self._pool_factory_kwargs
 
+    @property
+    def dedicated_probe(self) -> bool:
+        return self._dedicated_probe
+
+    @property
+    def _pool_reserved_size(self) -> int:
+        """Connections added to the pool size for the system connection."""
+        if self._dedicated_probe or self._reads_shared_topology:
+            return 0
+        return 1
+
+    @property
+    def _reads_shared_topology(self) -> bool:
+        """Whether the statuses of the hosts are read from the shared
+        topology written by another process."""
+        shared_topology = self._shared_topology
+        return shared_topology is not None and not shared_topology.publisher
+
+    @property
+    def initial_pool_factory_kwargs(self):
+        """Arguments the pools are created with, differ from
+        ``pool_factory_kwargs`` when the startup is throttled."""
+        return self._initial_pool_factory_kwargs
+
+    def pool_factory_kwargs_for(self, dsn: Dsn) -> Mapping[str, Any]:
+        """Arguments the pool of the given host is created with."""
+        name = self._pool_min_size_kwarg
+        if name is None or not self._dsn_is_lazy(dsn):
+            return self._initial_pool_factory_kwargs
+        kwargs = dict(self._initial_pool_factory_kwargs)
+        kwargs[name] = min(
+            kwargs.get(name, 0),
+            LAZY_POOL_MIN_SIZE * self._pool_reserved_size,
+        )
+        return MappingProxyType(kwargs)
+
     @property
     def master_pool_count(self):
         return len(self._master_pool_set)
@@ -251,6 +734,22 @@ class BasePoolManager(ABC):
     def available_pool_count(self):
         return self.master_pool_count + self.replica_pool_count
 
+    @property
+    def master_pools(self) -> Tuple[Any, ...]:
+        return self._master_pools
+
+    @property
+    def replica_pools(self) -> Tuple[Any, ...]:
+        return self._replica_pools
+
+    @property
+    def available_pools(self) -> Tuple[Any, ...]:
+        return self._available_pools
+
+    @property
+    def pools_version(self) -> int:
+        return self._pools_version
+
     @property
     def balancer(self) -> AbstractBalancerPolicy:
         return self._balancer
@@ -271,6 +770,28 @@ class BasePoolManager(ABC):
     def get_pool_freesize(self, pool):
         pass
 
+    def get_pool_waiters(self, pool) -> int:
+        """Number of acquires queued on the pool. Adapters override it
+        with the queue of the driver pool, which also counts acquires made
+        bypassing hasql; by default the acquires of this manager which have
+        not got a connection yet are counted."""
+        return max(
+            self._pool_inflight.get(pool, 0) - self._pool_held.get(pool, 0),
+            0,
+        )
+
+    def get_pool_load(self, pool) -> int:
+        """Queued acquires minus free connections of the pool, the pool
+        with the least load serves the next acquire first."""
+        return self.get_pool_waiters(pool) - self.get_pool_freesize(pool)
+
+    def pool_is_saturated(self, pool) -> bool:
+        # Waiters are usually more expensive to count than free connections
+        return (
+            self.get_pool_freesize(pool) <= 0 and
+            self.get_pool_waiters(pool) > 0
+        )
+
     @abstractmethod
     def acquire_from_pool(self, pool, **kwargs):
         pass
@@ -280,7 +801,7 @@ class BasePoolManager(ABC):
         pass
 
     @abstractmethod
-    async def _is_master(self, connection):
+    async def _fetchrow(self, connection, query: str) -> Optional[Sequence]:
         pass
 
     @abstractmethod
@@ -299,6 +820,21 @@ class BasePoolManager(ABC):
     def is_connection_closed(self, connection):
         pass
 
+    def _probe_connect_kwargs(self) -> Dict[str, Any]:
+        return {
+            key: value
+            for key, value in self._pool_factory_kwargs.items()
+            if key not in self._pool_only_kwargs
+        }
+
+    async def _connect_probe(self, pool, dsn: Dsn):
+        """Opens the connection checking the host outside of its pool,
+        used with ``dedicated_probe``."""
+        raise NotImplementedError
+
+    async def _close_probe(self, connection) -> None:
+        raise NotImplementedError
+
     @abstractmethod
     def host(self, pool: Any):
         pass
@@ -326,6 +862,9 @@ class BasePoolManager(ABC):
         fallback_master: Optional[bool] = None,
         master_as_replica_weight: Optional[float] = None,
         timeout: Optional[float] = None,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+        hedge_after: Optional[Union[float, str]] = None,
         **kwargs,
     ):
         if fallback_master is None:
@@ -343,6 +882,19 @@ class BasePoolManager(ABC):
                 "Field master_as_replica_weight must belong "
                 "to the segment [0; 1]",
             )
+        if not read_only and max_lag is not None:
+            raise ValueError(
+                "Field max_lag is used only when read_only is True",
+            )
+        if max_lag is not None and max_lag < 0:
+            raise ValueError("Field max_lag shouldn't be negative")
+        if not read_only and min_lsn is not None:
+            raise ValueError(
+                "Field min_lsn is used only when read_only is True",
+            )
+        context_factory = self._acquire_context_factory(
+            read_only, hedge_after,
+        )
 
         if read_only:
             if master_as_replica_weight is None:
@@ -351,18 +903,41 @@ class BasePoolManager(ABC):
         if timeout is None:
             timeout = self._acquire_timeout
 
-        ctx = PoolAcquireContext(
+        ctx = context_factory(
             pool_manager=self,
             read_only=read_only,
             fallback_master=fallback_master,
             master_as_replica_weight=master_as_replica_weight,
             timeout=timeout,
             metrics=self._metrics,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
             **kwargs,
         )
 
         return ctx
 
+    @staticmethod
+    def _acquire_context_factory(
+        read_only: bool,
+        hedge_after: Optional[Union[float, str]],
+    ) -> Callable[..., PoolAcquireContext]:
+        if hedge_after is None:
+            return PoolAcquireContext
+        if not read_only:
+            raise ValueError(
+                "Field hedge_after is used only when read_only is True",
+            )
+        if isinstance(hedge_after, str):
+            if hedge_after != HEDGE_AFTER_AUTO:
+                raise ValueError(
+                    f"Field hedge_after must be a number "
+                    f"or {HEDGE_AFTER_AUTO!r}",
+                )
+        elif hedge_after < 0:
+            raise ValueError("Field hedge_after shouldn't be negative")
+        return partial(HedgedPoolAcquireContext, hedge_after=hedge_after)
+
     def acquire_master(
         self,
         timeout: Optional[float] = None,
@@ -375,6 +950,9 @@ class BasePoolManager(ABC):
         fallback_master: Optional[bool] = None,
         master_as_replica_weight: Optional[float] = None,
         timeout: Optional[float] = None,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+        hedge_after: Optional[Union[float, str]] = None,
         **kwargs,
     ):
         return self.acquire(
@@ -382,9 +960,22 @@ class BasePoolManager(ABC):
             fallback_master=fallback_master,
             master_as_replica_weight=master_as_replica_weight,
             timeout=timeout,
+            max_lag=max_lag,
+            min_lsn=min_lsn,
+            hedge_after=hedge_after,
             **kwargs,
         )
 
+    async def capture_lsn(self, connection) -> int:
+        """Return the current WAL LSN of a master connection.
+
+        Pass the value as ``min_lsn`` to ``acquire_replica()`` to read
+        from a replica which has already replayed the preceding writes.
+        """
+        row = await self._fetchrow(connection, CURRENT_LSN_QUERY)
+        assert row is not None
+        return parse_lsn(row[0])
+
     async def release(self, connection, **kwargs):
         if connection not in self._unmanaged_connections:
             raise ValueError(
@@ -394,17 +985,62 @@ class BasePoolManager(ABC):
 
         pool = self._unmanaged_connections.pop(connection)
         self._metrics.remove_connection(self.host(pool))
-        await self.release_to_pool(connection, pool, **kwargs)
-
-    async def close(self):
+        self._remove_held(pool)
+        try:
+            await self.release_to_pool(connection, pool, **kwargs)
+        finally:
+            self._remove_inflight(pool)
+
+    async def close(self, drain_timeout: Optional[float] = None) -> int:
+        """Closes the pools and returns the number of connections which were
+        still in use (or being acquired) at that moment.
+
+        With ``drain_timeout`` new acquires are rejected with
+        ``PoolManagerClosingError`` at once, while the pools are closed
+        only after every acquired connection has been released or
+        ``drain_timeout`` seconds have passed. The pools whose connections
+        are still in use then are terminated, since a graceful close of
+        the driver pool waits for them.
+        """
         self._closing = True
+        stuck_pools: Set[Any] = set()
+        if drain_timeout is not None:
+            await self._drain(drain_timeout)
+            stuck_pools = {
+                pool for pool, inflight in self._pool_inflight.items()
+                if inflight
+            }
+        in_use = self._in_use_count()
+        if in_use:
+            logger.warning(
+                "Closing pools with %d connections still in use", in_use,
+            )
         await self._clear()
         await asyncio.gather(
-            *[self._close(pool) for pool in self._pools if pool is not None],
+            *[
+                self._terminate(pool) if pool in stuck_pools
+                else self._close(pool)
+                for pool in self._pools if pool is not None
+            ],
             return_exceptions=True,
         )
         self._closing = False
         self._closed = True
+        return in_use
+
+    def _in_use_count(self) -> int:
+        return sum(self._pool_inflight.values())
+
+    async def _drain(self, drain_timeout: float):
+        if not self._pool_inflight:
+            return
+        self._drained = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._drained = None
 
     async def terminate(self):
         self._closing = True
@@ -479,18 +1115,50 @@ class BasePoolManager(ABC):
             await self._replica_cond.wait_for(predicate)
 
     async def get_master_pools(self) -> List:
-        if not self._master_pool_set:
+        if not self._master_pools:
             async with self._master_cond:
                 await self._master_cond.wait()
-        return list(self._master_pool_set)
+        return list(self._master_pools)
 
-    async def get_replica_pools(self, fallback_master: bool = False) -> List:
-        if not self._replica_pool_set:
+    async def get_replica_pools(
+        self,
+        fallback_master: bool = False,
+        max_lag: Optional[float] = None,
+        min_lsn: Optional[int] = None,
+    ) -> List:
+        if max_lag is not None or min_lsn is not None:
+            return await self._get_suitable_replica_pools(
+                fallback_master=fallback_master,
+                max_lag=max_lag,
+                min_lsn=min_lsn,
+            )
+        if not self._replica_pools:
             if fallback_master:
                 return await self.get_master_pools()
             async with self._replica_cond:
                 await self._replica_cond.wait()
-        return list(self._replica_pool_set)
+        return list(self._replica_pools)
+
+    async def _get_suitable_replica_pools(
+        self,
+        fallback_master: bool,
+        max_lag: Optional[float],
+        min_lsn: Optional[int],
+    ) -> List:
+        while True:
+            pools = [
+                pool for pool in self._replica_pools
+                if self.pool_fits_max_lag(pool, max_lag) and
+                self.pool_fits_min_lsn(pool, min_lsn)
+            ]
+            if pools:
+                return pools
+            # Replicas which have not replayed min_lsn yet would serve
+            # stale data, so the master is the only consistent choice
+            if fallback_master or min_lsn is not None:
+                return await self.get_master_pools()
+            async with self._replica_cond:
+                await self._replica_cond.wait()
 
     def pool_is_master(self, pool) -> bool:
         return pool in self._master_pool_set
@@ -498,17 +1166,379 @@ class BasePoolManager(ABC):
     def pool_is_replica(self, pool) -> bool:
         return pool in self._replica_pool_set
 
+    def pool_is_lazy(self, pool) -> bool:
+        """Whether the pool of a host from ``lazy_hosts`` has not been
+        selected by a balancer yet and keeps the system connection only."""
+        return pool in self._lazy_pools
+
+    def get_pool_host_status(self, pool) -> Optional[HostStatus]:
+        """Result of the last successful check of the host."""
+        return self._pool_host_status.get(pool)
+
+    def get_pool_replication_lag(self, pool) -> Optional[float]:
+        status = self._pool_host_status.get(pool)
+        return None if status is None else status.replication_lag
+
+    def pool_fits_max_lag(self, pool, max_lag: Optional[float]) -> bool:
+        if max_lag is None:
+            return True
+        lag = self.get_pool_replication_lag(pool)
+        return lag is not None and lag <= max_lag
+
+    def get_pool_replay_lsn(self, pool) -> Optional[int]:
+        status = self._pool_host_status.get(pool)
+        return None if status is None else status.replay_lsn
+
+    def pool_fits_min_lsn(self, pool, min_lsn: Optional[int]) -> bool:
+        if min_lsn is None or pool in self._master_pool_set:
+            return True
+        replay_lsn = self.get_pool_replay_lsn(pool)
+        return replay_lsn is not None and replay_lsn >= min_lsn
+
     def register_connection(self, connection, pool):
         self._unmanaged_connections[connection] = pool
 
-    def get_last_response_time(self, pool) -> Optional[float]:
-        return self._stopwatch.get_time(pool)
+    def get_last_response_time(
+        self,
+        pool,
+        percentile: float = 0.5,
+    ) -> Optional[float]:
+        return self._stopwatch.get_time(pool, percentile)
+
+    def get_pool_inflight(self, pool) -> int:
+        return self._pool_inflight.get(pool, 0)
+
+    def get_pool_acquire_time(self, pool) -> Optional[float]:
+        return self._acquire_time.get(pool)
+
+    def get_pool_hold_time(self, pool) -> Optional[float]:
+        return self._hold_time.get(pool)
+
+    def get_replica_acquire_time(
+        self,
+        percentile: float = 0.5,
+    ) -> Optional[float]:
+        """Percentile of the recent successful acquires from all replicas,
+        None until a replica connection has been acquired."""
+        return self._replica_acquire_window.percentile(percentile)
+
+    def _add_replica_acquire_time(self, pool, elapsed: float):
+        if pool in self._replica_pool_set:
+            self._replica_acquire_window.add(elapsed)
+
+    def _add_acquire_time(self, pool, elapsed: float):
+        self._acquire_time.add(pool, elapsed)
+        if self._outlier_detector is not None:
+            self._outlier_detector.add_acquire(pool, elapsed)
+
+    def _add_hold_time(self, pool, elapsed: float):
+        self._hold_time.add(pool, elapsed)
+
+    def _add_inflight(self, pool):
+        self._pool_inflight[pool] += 1
+
+    def _remove_inflight(self, pool):
+        inflight = self._pool_inflight.get(pool, 0) - 1
+        if inflight > 0:
+            self._pool_inflight[pool] = inflight
+        else:
+            self._pool_inflight.pop(pool, None)
+            if self._drained is not None and not self._pool_inflight:
+                self._drained.set()
+
+    def _add_held(self, pool):
+        self._pool_held[pool] += 1
+
+    def _remove_held(self, pool):
+        held = self._pool_held.get(pool, 0) - 1
+        if held > 0:
+            self._pool_held[pool] = held
+        else:
+            self._pool_held.pop(pool, None)
+
+    def _is_acquire_timeout(self, error: Exception) -> bool:
+        return isinstance(error, asyncio.TimeoutError)
+
+    def _is_connection_error(self, error: Exception) -> bool:
+        """Whether the error means that the host itself is not reachable.
+
+        Adapters extend it with the connection errors of their driver.
+        """
+        return isinstance(error, OSError) and not isinstance(
+            error, asyncio.TimeoutError,
+        )
+
+    def is_pool_quarantined(self, pool) -> bool:
+        return pool in self._pool_quarantined_at
+
+    def is_pool_ejected(self, pool) -> bool:
+        if self._outlier_detector is None:
+            return False
+        return self._outlier_detector.is_ejected(pool)
+
+    def _handle_acquire_error(
+        self, pool, error: Exception, budget: float = 1.,
+    ):
+        """Counts the error of an acquire from the pool and quarantines
+        the pool when the error means that its host is unreachable.
+
+        ``budget`` is the share of the acquire timeout which was left to
+        the driver pool after the balancer has chosen it.
+        """
+        is_timeout = self._is_acquire_timeout(error)
+        if is_timeout and budget < MIN_QUARANTINE_ACQUIRE_BUDGET:
+            return
+        if self._outlier_detector is not None:
+            self._outlier_detector.add_error(pool)
+        if is_timeout:
+            # Timing out while the application holds every connection of
+            # the pool is backpressure, not a sign of a dead host
+            if (
+                self._pool_held.get(pool, 0) and
+                not self.get_pool_freesize(pool)
+            ):
+                return
+        elif not self._is_connection_error(error):
+            return
+        self._quarantine_pool(pool, error)
+
+    def _quarantine_pool(self, pool, error: Exception):
+        if self._closing or pool not in self._pools:
+            return
+
+        dsn = self._dsn[self._pools.index(pool)]
+        logger.warning(
+            "Pool for dsn=%s has been quarantined after acquire error: %r",
+            dsn.with_(password="******"),
+            error,
+        )
+        # The pool returns to the candidates only after a check which has
+        # started after this moment succeeds, see _refresh_pool_role
+        self._pool_quarantined_at[pool] = time.monotonic()
+        self._remove_pool_from_master_set(pool, dsn)
+        self._remove_pool_from_replica_set(pool, dsn)
+        self._request_check(dsn)
+
+    def _request_check(self, dsn: Dsn):
+        shared_topology = self._shared_topology
+        if shared_topology is not None and not shared_topology.publisher:
+            # The local check only reads the file, the host is checked by
+            # the publisher
+            shared_topology.request_check(dsn)
+        if self._topology_monitor is not None:
+            self._topology_monitor.request_check(dsn)
+        if (
+            self._topology_monitor is None or
+            # The host is watched by the monitor only after its pool
+            # has been created, retries of the creation wait here
+            self._pools[self._dsn.index(dsn)] is None
+        ):
+            self._dsn_recheck_event[dsn].set()
+
+    def notify_role_change(self, hosts: Optional[Iterable[str]] = None) -> int:
+        """Checks the hosts (``host`` or ``host:port``, all of them by
+        default) right away instead of waiting for the refresh delay.
+
+        Meant to be called by external sources of failover events, e.g.
+        a ``LISTEN`` channel or a watcher of the cluster manager. Must be
+        called from the event loop of the pool manager. Returns the number
+        of hosts whose check has been requested.
+        """
+        if self._closing:
+            return 0
+        host_set = None if hosts is None else frozenset(hosts)
+        count = 0
+        for dsn in self._dsn:
+            if host_set is None or self._dsn_matches(dsn, host_set):
+                self._request_check(dsn)
+                count += 1
+        return count
+
+    async def _wait_refresh_delay(self, dsn: Dsn, delay: float):
+        # Sleeps between checks or pool creation attempts, but wakes up
+        # as soon as an out of band check is requested. Closing is checked
+        # first, since wait_for of python 3.11 loses the cancellation
+        # which comes together with the result of a check
+        if self._closing:
+            return
+        recheck_event = self._dsn_recheck_event[dsn]
+        try:
+            await asyncio.wait_for(recheck_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        recheck_event.clear()
 
     def _prepare_pool_factory_kwargs(self, kwargs: dict) -> dict:
         return kwargs
 
+    def _prepare_host_status_query(
+        self, probe_expression: Optional[str],
+    ) -> str:
+        if probe_expression is None:
+            return HOST_STATUS_QUERY
+        return f"{HOST_STATUS_QUERY}, ({probe_expression})"
+
+    def _prepare_initial_pool_factory_kwargs(self) -> dict:
+        kwargs = dict(self._pool_factory_kwargs)
+        name = self._pool_min_size_kwarg
+        if (
+            self._startup_semaphore is not None and
+            name is not None and
+            kwargs.get(name, 0) > STARTUP_POOL_MIN_SIZE
+        ):
+            kwargs[name] = STARTUP_POOL_MIN_SIZE
+        return kwargs
+
+    @staticmethod
+    def _dsn_matches(dsn: Dsn, hosts: AbstractSet[str]) -> bool:
+        netloc = dsn.netloc
+        return netloc in hosts or netloc.rsplit(":", 1)[0] in hosts
+
+    def _dsn_is_lazy(self, dsn: Dsn) -> bool:
+        return bool(self._lazy_hosts) and self._dsn_matches(
+            dsn, self._lazy_hosts,
+        )
+
+    def _materialize_pool(self, pool):
+        """Opens the rest of the connections of a lazy pool in background,
+        acquires don't wait for them and are served by the driver on demand.
+        """
+        dsn = self._lazy_pools.pop(pool, None)
+        if dsn is None:
+            return
+        logger.debug(
+            "Materializing lazy pool for dsn=%s",
+            dsn.with_(password="******"),
+        )
+        self._start_warm_up(pool, dsn)
+
+    def _start_warm_up(self, pool, dsn: Dsn):
+        name = self._pool_min_size_kwarg
+        if (
+            name is None or
+            self.pool_factory_kwargs_for(dsn).get(name) ==
+            self._pool_factory_kwargs.get(name)
+        ):
+            return
+        task = asyncio.create_task(self._warm_up(pool, dsn))
+        self._warm_up_tasks.add(task)
+        task.add_done_callback(self._warm_up_tasks.discard)
+
+    def _finish_starting(self, dsn: Dsn):
+        self._dsn_starting.discard(dsn)
+        if not self._dsn_starting:
+            self._startup_done.set()
+
+    async def _warm_up(self, pool, dsn: Dsn):
+        # No pool is filled until every host has got its pool created and
+        # its role checked, or has failed it once, so a dead host doesn't
+        # hold the warm-ups back for good
+        await self._startup_done.wait()
+        try:
+            await self._warm_up_pool(pool)
+        except Exception:
+            logger.warning(
+                "Warming up pool failed for dsn=%s",
+                dsn.with_(password="******"),
+                exc_info=True,
+            )
+
+    async def _warm_up_pool(self, pool):
+        """Opens the connections the pool has been created without.
+
+        By default they are acquired at once, startup_concurrency at a time
+        if it is set, and returned to the pool. Warm-ups have a limiter of
+        their own, so they never compete with the creation of the pools.
+        The system connection is held by the background check, so one
+        connection less is acquired unless the host is checked with
+        a dedicated probe connection.
+        """
+        assert self._pool_min_size_kwarg is not None
+        semaphore = self._warm_up_semaphore
+
+        async def acquire():
+            async with semaphore or nullcontext():
+                return await asyncio.wait_for(
+                    self.acquire_from_pool(pool),
+                    timeout=self._refresh_timeout,
+                )
+
+        count = (
+            self._pool_factory_kwargs[self._pool_min_size_kwarg] -
+            self._pool_reserved_size
+        )
+        connections = await asyncio.gather(
+            *(acquire() for _ in range(count)),
+            return_exceptions=True,
+        )
+        for connection in connections:
+            if not isinstance(connection, BaseException):
+                await self.release_to_pool(connection, pool)
+
+    def _reap_release(
+        self,
+        pool,
+        release: "asyncio.Future[Any]",
+        connection,
+    ):
+        """Takes over a release which has exceeded ``release_timeout``."""
+        host = self.host(pool)
+        self._metrics.add_release_timeout(host)
+        logger.warning(
+            "Release of a connection to %s has not completed in %.1f sec, "
+            "terminating the connection",
+            host,
+            self._release_timeout,
+        )
+        task = asyncio.create_task(self._reap(release, connection))
+        self._reaper_tasks.add(task)
+        task.add_done_callback(self._reaper_tasks.discard)
+
+    async def _reap(self, release: "asyncio.Future[Any]", connection):
+        timeout = self._release_timeout
+        assert timeout is not None
+        # Closing the socket usually makes the stuck release fail at once
+        try:
+            await wait_for(
+                self._terminate_connection(connection),
+                timeout=timeout,
+            )
+        except Exception:
+            logger.exception("Failed to terminate the connection")
+
+        await asyncio.wait({release}, timeout=timeout)
+        if not release.done():
+            release.cancel()
+            await asyncio.gather(release, return_exceptions=True)
+        elif not release.cancelled() and release.exception() is not None:
+            logger.debug(
+                "Release of a terminated connection has failed",
+                exc_info=release.exception(),
+            )
+
+    async def _terminate_connection(self, connection) -> None:
+        """Closes the connection without talking to the server. Used for
+        connections whose release has exceeded ``release_timeout``."""
+
     async def _clear(self):
         self._balancer = None
+        for warm_up_task in self._warm_up_tasks:
+            warm_up_task.cancel()
+        await asyncio.gather(*self._warm_up_tasks, return_exceptions=True)
+        self._lazy_pools.clear()
+        if self._outlier_detection_task is not None:
+            self._outlier_detection_task.cancel()
+            await asyncio.gather(
+                self._outlier_detection_task, return_exceptions=True,
+            )
+            self._outlier_detection_task = None
+        if self._check_requests_task is not None:
+            self._check_requests_task.cancel()
+            await asyncio.gather(
+                self._check_requests_task, return_exceptions=True,
+            )
+            self._check_requests_task = None
+
         if self._refresh_role_tasks is not None:
             for refresh_role_task in self._refresh_role_tasks:
                 refresh_role_task.cancel()
@@ -520,6 +1550,10 @@ class BasePoolManager(ABC):
 
             self._refresh_role_tasks = None
 
+        # Reapers are bounded by release_timeout and finish before
+        # the pools of their connections are closed
+        await asyncio.gather(*self._reaper_tasks, return_exceptions=True)
+
         release_tasks = []
         for connection in self._unmanaged_connections:
             release_tasks.append(self.release(connection))
@@ -529,14 +1563,21 @@ class BasePoolManager(ABC):
         self._unmanaged_connections.clear()
         self._master_pool_set.clear()
         self._replica_pool_set.clear()
+        self._rebuild_pool_tuples()
 
     async def _check_pool_task(self, index: int):
         logger.debug("Starting pool task")
         dsn = self._dsn[index]
-        censored_dsn = str(dsn.with_(password="******"))
         pool = await self._wait_creating_pool(dsn)
         self._pools[index] = pool
 
+        if self._topology_monitor is None:
+            await self._check_pool(pool, dsn)
+        else:
+            await self._topology_monitor.watch(dsn, self, pool)
+
+    async def _check_pool(self, pool, dsn: Dsn):
+        censored_dsn = str(dsn.with_(password="******"))
         logger.debug("Setting dsn=%r event", censored_dsn)
         sys_connection = None
         while not self._closing:
@@ -547,10 +1588,10 @@ class BasePoolManager(ABC):
                     "Acquiring connection for checking dsn=%r",
                     censored_dsn,
                 )
-                sys_connection = await asyncio.wait_for(
-                    self.acquire_from_pool(pool),
-                    timeout=self._refresh_timeout,
-                )
+                if not self._reads_shared_topology:
+                    sys_connection = await self._open_sys_connection(
+                        pool, dsn,
+                    )
 
                 logger.debug("Checking dsn=%r", censored_dsn)
                 await self._periodic_pool_check(pool, dsn, sys_connection)
@@ -559,8 +1600,7 @@ class BasePoolManager(ABC):
                     "Creating system connection failed for dsn=%r",
                     censored_dsn,
                 )
-                self._remove_pool_from_master_set(pool, dsn)
-                self._remove_pool_from_replica_set(pool, dsn)
+                await self._host_unavailable(pool, dsn)
             except asyncio.CancelledError as cancelled_error:
                 if self._closing:
                     raise cancelled_error from None
@@ -569,76 +1609,152 @@ class BasePoolManager(ABC):
                     censored_dsn,
                     exc_info=True,
                 )
-                self._remove_pool_from_master_set(pool, dsn)
-                self._remove_pool_from_replica_set(pool, dsn)
+                await self._host_unavailable(pool, dsn)
             except Exception:
                 logger.warning(
                     "Database is not available with exception for dsn=%r",
                     censored_dsn,
                     exc_info=True,
                 )
-                self._remove_pool_from_master_set(pool, dsn)
-                self._remove_pool_from_replica_set(pool, dsn)
+                await self._host_unavailable(pool, dsn)
             finally:
                 if sys_connection is not None:
-                    try:
-                        await self.release_to_pool(sys_connection, pool)
-                    except asyncio.CancelledError as cancelled_error:
-                        if self._closing:
-                            raise cancelled_error from None
-                        logger.warning(
-                            "Release connection to pool with "
-                            "Cancelled error for dsn=%r",
-                            censored_dsn,
-                            exc_info=True,
-                        )
-                    except Exception:
-                        logger.warning(
-                            "Release connection to pool with "
-                            "exception for dsn=%r",
-                            censored_dsn,
-                            exc_info=True,
-                        )
+                    await self._release_sys_connection(
+                        sys_connection, pool, censored_dsn,
+                    )
                     sys_connection = None
                 await self._notify_about_pool_has_checked(dsn)
 
-            await asyncio.sleep(self._refresh_delay)
+            await self._wait_refresh_delay(
+                dsn, self._refresh_scheduler.on_check_failed(dsn),
+            )
+
+    async def _release_sys_connection(
+        self, sys_connection, pool, censored_dsn: str,
+    ):
+        try:
+            await self._close_sys_connection(sys_connection, pool)
+        except asyncio.CancelledError as cancelled_error:
+            if self._closing:
+                raise cancelled_error from None
+            logger.warning(
+                "Release connection to pool with "
+                "Cancelled error for dsn=%r",
+                censored_dsn,
+                exc_info=True,
+            )
+        except Exception:
+            logger.warning(
+                "Release connection to pool with "
+                "exception for dsn=%r",
+                censored_dsn,
+                exc_info=True,
+            )
 
     async def _wait_creating_pool(self, dsn: Dsn):
         while not self._closing:
             try:
-                return await asyncio.wait_for(
-                    self._pool_factory(dsn),
-                    timeout=self._refresh_timeout,
-                )
+                async with self._startup_semaphore or nullcontext():
+                    pool = await asyncio.wait_for(
+                        self._pool_factory(dsn),
+                        timeout=self._refresh_timeout,
+                    )
+                if self._dsn_is_lazy(dsn):
+                    self._lazy_pools[pool] = dsn
+                else:
+                    self._start_warm_up(pool, dsn)
+                return pool
             except Exception:
                 logger.warning(
                     "Creating pool failed with exception for dsn=%s",
                     dsn.with_(password="******"),
                     exc_info=True,
                 )
-                await asyncio.sleep(self._refresh_delay)
+                self._finish_starting(dsn)
+                await self._wait_refresh_delay(
+                    dsn, self._refresh_scheduler.on_check_failed(dsn),
+                )
+
+    async def _open_sys_connection(self, pool, dsn: Dsn):
+        if self._dedicated_probe:
+            return await asyncio.wait_for(
+                self._connect_probe(pool, dsn),
+                timeout=self._probe_timeout,
+            )
+        return await asyncio.wait_for(
+            self.acquire_from_pool(pool),
+            timeout=self._refresh_timeout,
+        )
+
+    async def _close_sys_connection(self, sys_connection, pool):
+        if self._dedicated_probe:
+            await asyncio.wait_for(
+                self._close_probe(sys_connection),
+                timeout=self._probe_timeout,
+            )
+        else:
+            await self.release_to_pool(sys_connection, pool)
 
     async def _periodic_pool_check(self, pool, dsn: Dsn, sys_connection):
+        check_timeout = (
+            self._probe_timeout if self._dedicated_probe
+            else self._refresh_timeout
+        )
         while not self._closing:
             try:
-                await asyncio.wait_for(
+                role_changed = await asyncio.wait_for(
                     self._refresh_pool_role(pool, dsn, sys_connection),
-                    timeout=self._refresh_timeout,
+                    timeout=check_timeout,
                 )
                 await self._notify_about_pool_has_checked(dsn)
+                delay = self._refresh_scheduler.on_check_succeeded(
+                    dsn, role_changed,
+                )
             except asyncio.TimeoutError:
                 logger.warning(
                     "Periodic pool check failed for dsn=%s",
                     dsn.with_(password="******"),
                 )
-                self._remove_pool_from_master_set(pool, dsn)
-                self._remove_pool_from_replica_set(pool, dsn)
+                await self._host_unavailable(pool, dsn)
+                if self._dedicated_probe:
+                    # The probe is reopened instead of waiting for the
+                    # answer of the timed out check
+                    return
                 await self._notify_about_pool_has_checked(dsn)
+                delay = self._refresh_scheduler.on_check_failed(dsn)
+
+            await self._wait_refresh_delay(dsn, delay)
+
+    def _rebuild_pool_tuples(self):
+        # Role changes are rare compared to acquires, so candidates are
+        # prepared here once, in dsn order, and balancers only index them
+        self._master_pools = tuple(
+            pool for pool in self._pools if pool in self._master_pool_set
+        )
+        self._replica_pools = tuple(
+            pool for pool in self._pools
+            if pool in self._replica_pool_set and not self.is_pool_ejected(pool)
+        )
+        self._available_pools = self._replica_pools + self._master_pools
+        self._pools_version += 1
 
-            await asyncio.sleep(self._refresh_delay)
+    async def _outlier_detection(self):
+        assert self._outlier_detector is not None
+        while not self._closing:
+            await asyncio.sleep(self._outlier_detector.settings.interval)
+            await self._detect_outliers()
+
+    async def _detect_outliers(self):
+        assert self._outlier_detector is not None
+        if not self._outlier_detector.evaluate():
+            return
+        self._rebuild_pool_tuples()
+        # Replicas which are back may be awaited by acquires
+        async with self._replica_cond:
+            self._replica_cond.notify_all()
 
     async def _notify_about_pool_has_checked(self, dsn: Dsn):
+        self._finish_starting(dsn)
         async with self._dsn_check_cond[dsn]:
             self._dsn_check_cond[dsn].notify_all()
 
@@ -646,6 +1762,7 @@ class BasePoolManager(ABC):
         if pool in self._master_pool_set:
             return
         self._master_pool_set.add(pool)
+        self._rebuild_pool_tuples()
         logger.debug(
             "Pool %s has been added to master set",
             dsn.with_(password="******"),
@@ -657,6 +1774,7 @@ class BasePoolManager(ABC):
         if pool in self._replica_pool_set:
             return
         self._replica_pool_set.add(pool)
+        self._rebuild_pool_tuples()
         logger.debug(
             "Pool %s has been added to replica set",
             dsn.with_(password="******"),
@@ -667,6 +1785,7 @@ class BasePoolManager(ABC):
     def _remove_pool_from_master_set(self, pool, dsn: Dsn):
         if pool in self._master_pool_set:
             self._master_pool_set.remove(pool)
+            self._rebuild_pool_tuples()
             logger.debug(
                 "Pool %s has been removed from master set",
                 dsn.with_(password="******"),
@@ -675,14 +1794,180 @@ class BasePoolManager(ABC):
     def _remove_pool_from_replica_set(self, pool, dsn: Dsn):
         if pool in self._replica_pool_set:
             self._replica_pool_set.remove(pool)
+            self._rebuild_pool_tuples()
             logger.debug(
                 "Pool %s has been removed from replica set",
                 dsn.with_(password="******"),
             )
 
-    async def _refresh_pool_role(self, pool, dsn: Dsn, sys_connection):
-        with self._stopwatch(pool):
-            is_master = await self._is_master(sys_connection)
+    async def _set_pool_host_status(self, pool, status: HostStatus):
+        changed = (
+            self.get_pool_replication_lag(pool) != status.replication_lag or
+            self.get_pool_replay_lsn(pool) != status.replay_lsn
+        )
+        self._pool_host_status[pool] = status
+
+        # Wake up acquires waiting for a replica within max_lag or min_lsn
+        if changed and pool in self._replica_pool_set:
+            async with self._replica_cond:
+                self._replica_cond.notify_all()
+
+    async def _host_unavailable(self, pool, dsn: Dsn):
+        self._remove_pool_from_master_set(pool, dsn)
+        self._remove_pool_from_replica_set(pool, dsn)
+        await self._publish_host_status(dsn, None, time.monotonic())
+
+    async def _publish_host_status(
+        self,
+        dsn: Dsn,
+        status: Optional[HostStatus],
+        started_at: float,
+    ):
+        shared_topology = self._shared_topology
+        if shared_topology is not None and shared_topology.publisher:
+            shared_topology.write(
+                dsn, status, time.time() - (time.monotonic() - started_at),
+            )
+        if self._topology_monitor is not None:
+            await self._topology_monitor.publish(
+                dsn, self, status, started_at,
+            )
+
+    async def _receive_host_status(
+        self,
+        pool,
+        dsn: Dsn,
+        status: Optional[HostStatus],
+        started_at: float,
+    ):
+        """Applies the status of a host checked by another manager
+        subscribed to the same topology monitor."""
+        if status is None:
+            self._remove_pool_from_master_set(pool, dsn)
+            self._remove_pool_from_replica_set(pool, dsn)
+        else:
+            await self._apply_host_status(pool, dsn, status, started_at)
+        await self._notify_about_pool_has_checked(dsn)
+
+    async def _fetch_host_status(
+        self, connection, query: str,
+    ) -> Optional[Sequence]:
+        """Runs the check query on the system connection. Adapters whose
+        connections start transactions implicitly end them here, otherwise
+        the statistics columns stay frozen within the transaction."""
+        return await self._fetchrow(connection, query)
+
+    async def _probe_host(self, sys_connection) -> HostStatus:
+        started_at = time.monotonic()
+        row = await self._fetch_host_status(
+            sys_connection, self._host_status_query,
+        )
+        response_time = time.monotonic() - started_at
+        if row is None:
+            raise ConnectionError("Check query has returned no rows")
+        return self._parse_host_status(row, response_time)
+
+    def _parse_host_status(
+        self, row: Sequence, response_time: float,
+    ) -> HostStatus:
+        read_only, in_recovery, lag, replay_lsn, backends = row[:5]
+        is_master = read_only == "off"
+        return HostStatus(
+            is_master=is_master,
+            replication_lag=(
+                0.0 if is_master else None if lag is None else float(lag)
+            ),
+            replay_lsn=(
+                None if is_master or replay_lsn is None
+                else parse_lsn(replay_lsn)
+            ),
+            response_time=response_time,
+            in_recovery=in_recovery,
+            backends=backends,
+            expression=row[5] if len(row) > 5 else None,
+        )
+
+    async def _refresh_pool_role(
+        self, pool, dsn: Dsn, sys_connection,
+    ) -> bool:
+        """Checks the host and returns whether it has got a new role,
+        including the very first role and coming back after an outage."""
+        started_at, status = await self._get_host_status(
+            pool, dsn, sys_connection,
+        )
+        if status is None:
+            # Unlike a failed check it keeps the system connection and
+            # the refresh delay, the host is unavailable for the publisher
+            role_changed = (
+                pool in self._master_pool_set or
+                pool in self._replica_pool_set
+            )
+            self._remove_pool_from_master_set(pool, dsn)
+            self._remove_pool_from_replica_set(pool, dsn)
+        else:
+            role_changed = await self._apply_host_status(
+                pool, dsn, status, started_at,
+            )
+        await self._publish_host_status(dsn, status, started_at)
+        return role_changed
+
+    async def _get_host_status(
+        self, pool, dsn: Dsn, sys_connection,
+    ) -> Tuple[float, Optional[HostStatus]]:
+        """Returns the time the check has started and the status of the
+        host, taken from the shared topology while it is fresh. The status
+        is None when the publisher has found the host unavailable."""
+        shared_topology = self._shared_topology
+        record = None
+        if shared_topology is not None and not shared_topology.publisher:
+            record = shared_topology.read(dsn)
+        if record is None:
+            # No fresh status in the file, the host is not known yet
+            started_at = time.monotonic()
+            if sys_connection is not None:
+                return started_at, await self._probe_host(sys_connection)
+            # Readers hold no system connection, it is opened only for the
+            # checks of their own, e.g. while the publisher is stopped
+            sys_connection = await self._open_sys_connection(pool, dsn)
+            try:
+                return started_at, await self._probe_host(sys_connection)
+            finally:
+                await self._close_sys_connection(sys_connection, pool)
+
+        checked_at, status = record
+        return time.monotonic() - max(time.time() - checked_at, 0.), status
+
+    def _start_serving_check_requests(self) -> Optional[asyncio.Task]:
+        shared_topology = self._shared_topology
+        if shared_topology is None or not shared_topology.publisher:
+            return None
+        return asyncio.create_task(self._serve_check_requests())
+
+    async def _serve_check_requests(self):
+        # Readers of the shared topology can't wake up the checks of the
+        # publisher directly, so the publisher polls their requests
+        shared_topology = self._shared_topology
+        assert shared_topology is not None
+        while not self._closing:
+            await asyncio.sleep(shared_topology.request_poll_interval)
+            for dsn in shared_topology.requested_checks():
+                self._request_check(dsn)
+
+    async def _apply_host_status(
+        self, pool, dsn: Dsn, status: HostStatus, started_at: float,
+    ) -> bool:
+        self._stopwatch.add(pool, status.response_time)
+        is_master = status.is_master
+        quarantined_at = self._pool_quarantined_at.get(pool)
+        if quarantined_at is not None:
+            if quarantined_at > started_at:
+                # The check raced with an acquire error, its result is stale
+                return True
+            del self._pool_quarantined_at[pool]
+        role_changed = pool not in (
+            self._master_pool_set if is_master else self._replica_pool_set
+        )
+        await self._set_pool_host_status(pool, status)
         if is_master:
             await self._add_pool_to_master_set(pool, dsn)
             self._remove_pool_from_replica_set(pool, dsn)
@@ -690,6 +1975,7 @@ class BasePoolManager(ABC):
             await self._add_pool_to_replica_set(pool, dsn)
             self._remove_pool_from_master_set(pool, dsn)
         self._dsn_ready_event[dsn].set()
+        return role_changed
 
     def __iter__(self):
         return chain(iter(self._master_pool_set), iter(self._replica_pool_set))
@@ -705,5 +1991,8 @@ class BasePoolManager(ABC):
 __all__ = (
     "BasePoolManager",
     "AbstractBalancerPolicy",
+    "HEDGE_AFTER_AUTO",
+    "LAZY_POOL_MIN_SIZE",
+    "PoolManagerClosingError",
     "TimeoutAcquireContext",
 )
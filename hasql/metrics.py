@@ -1,8 +1,23 @@
+import math
 import time
 from collections import defaultdict
 from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Dict, Sequence
+from typing import (
+    TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple,
+)
+
+
+if TYPE_CHECKING:
+    from .base import BasePoolManager
+
+
+# Buckets from 100 microseconds to 100 seconds
+DEFAULT_HISTOGRAM_MIN_VALUE = 0.0001
+DEFAULT_HISTOGRAM_DECADES = 6
+
+# Host label of the get_pool() waits which ended without choosing a pool
+NO_HOST = "none"
 
 
 @dataclass(frozen=True)
@@ -22,6 +37,86 @@ class HasqlMetrics:
     acquire_time: Dict[str, float]
     add_connections: Dict[str, int]
     remove_connections: Dict[str, int]
+    # Time spent by the balancer choosing a pool, per chosen host
+    get_pool_histogram: Dict[str, "Histogram"] = field(default_factory=dict)
+    # Time spent by the driver pool acquiring a connection, per host
+    acquire_histogram: Dict[str, "Histogram"] = field(default_factory=dict)
+    # Hedged acquires started, per host of the second replica
+    hedges: Dict[str, int] = field(default_factory=dict)
+    # Releases which exceeded release_timeout and were terminated
+    release_timeouts: Dict[str, int] = field(default_factory=dict)
+
+
+class Histogram:
+    """Log-linear histogram of durations in seconds.
+
+    Every decade above ``min_value`` is split into nine linear buckets
+    (2, 3, ..., 10 times the start of the decade), so the relative error
+    stays bounded while the bucket of a sample is found in O(1) with
+    a logarithm. Counters are preallocated and never grow.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum", "_min_value")
+
+    def __init__(
+        self,
+        min_value: float = DEFAULT_HISTOGRAM_MIN_VALUE,
+        decades: int = DEFAULT_HISTOGRAM_DECADES,
+    ):
+        if min_value <= 0:
+            raise ValueError("min_value must be positive")
+        if decades < 1:
+            raise ValueError("decades must be positive")
+        self._min_value = min_value
+        # Rounded to 12 significant digits, so 3e-4 is not exported
+        # as 0.00030000000000000003 in the labels of the buckets
+        self.bounds: Tuple[float, ...] = (min_value,) + tuple(
+            float(f"{min_value * 10 ** decade * step:.12g}")
+            for decade in range(decades)
+            for step in range(2, 11)
+        )
+        # The last one counts samples above the largest bound
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.
+
+    def _index(self, value: float) -> int:
+        if value <= self._min_value:
+            return 0
+        ratio = value / self._min_value
+        decade = int(math.log10(ratio))
+        step = math.ceil(ratio / 10 ** decade)
+        index = min(decade * 9 + step - 1, len(self.bounds))
+        # Floating point rounding may land a sample on the edge
+        # of a bucket in the neighbouring one
+        if index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        elif index > 0 and value <= self.bounds[index - 1]:
+            index -= 1
+        return index
+
+    def observe(self, value: float) -> None:
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        total = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the quantile, ``0.99`` is p99."""
+        if not 0 <= quantile <= 1:
+            raise ValueError("quantile must belong to the segment [0; 1]")
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        for bound, total in self.cumulative():
+            if total >= rank and total:
+                return bound
+        return math.inf
 
 
 @dataclass
@@ -34,6 +129,14 @@ class CalculateMetrics:
     )
     _add_connections: Dict[str, int] = field(default_factory=dict)
     _remove_connections: Dict[str, int] = field(default_factory=dict)
+    _get_pool_histogram: Dict[str, Histogram] = field(
+        default_factory=lambda: defaultdict(Histogram)
+    )
+    _acquire_histogram: Dict[str, Histogram] = field(
+        default_factory=lambda: defaultdict(Histogram)
+    )
+    _hedges: Dict[str, int] = field(default_factory=dict)
+    _release_timeouts: Dict[str, int] = field(default_factory=dict)
 
     def metrics(self) -> HasqlMetrics:
         return HasqlMetrics(
@@ -43,6 +146,10 @@ class CalculateMetrics:
             acquire_time=self._acquire_time,
             add_connections=self._add_connections,
             remove_connections=self._remove_connections,
+            get_pool_histogram=self._get_pool_histogram,
+            acquire_histogram=self._acquire_histogram,
+            hedges=self._hedges,
+            release_timeouts=self._release_timeouts,
         )
 
     @contextmanager
@@ -52,12 +159,20 @@ class CalculateMetrics:
         yield
         self._pool_time += time.monotonic() - tt
 
+    def add_get_pool_time(self, pool: str, elapsed: float):
+        self._get_pool_histogram[pool].observe(elapsed)
+
     @contextmanager
     def with_acquire(self, pool: str):
         self._acquire[pool] += 1
         tt = time.monotonic()
-        yield
-        self._acquire_time[pool] += time.monotonic() - tt
+        try:
+            yield
+        finally:
+            # Failed and timed out acquires are the tail we are after
+            elapsed = time.monotonic() - tt
+            self._acquire_time[pool] += elapsed
+            self._acquire_histogram[pool].observe(elapsed)
 
     def add_connection(self, dsn: str):
         self._add_connections[dsn] = (
@@ -69,8 +184,262 @@ class CalculateMetrics:
             self._remove_connections.get(dsn, 0) + 1
         )
 
+    def add_hedge(self, dsn: str):
+        self._hedges[dsn] = self._hedges.get(dsn, 0) + 1
+
+    def add_release_timeout(self, dsn: str):
+        self._release_timeouts[dsn] = self._release_timeouts.get(dsn, 0) + 1
+
 
 @dataclass(frozen=True)
 class Metrics:
     drivers: Sequence[DriverMetrics]
     hasql: HasqlMetrics
+
+
+OPENMETRICS_CONTENT_TYPE = (
+    "application/openmetrics-text; version=1.0.0; charset=utf-8"
+)
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+class OpenMetricsExporter:
+    """Renders pool manager metrics in the OpenMetrics text format.
+
+    Values are read from the pool manager state directly on every
+    :meth:`render` call, nothing is copied in between. The output can be
+    served as is with :data:`OPENMETRICS_CONTENT_TYPE`.
+    """
+
+    response_time_quantiles = (0.5, 0.9, 0.99)
+    pool_roles = ("master", "replica", "ejected", "quarantined", "unavailable")
+
+    def __init__(self, pool_manager: "BasePoolManager", prefix: str = "hasql"):
+        self._pool_manager = pool_manager
+        self._prefix = prefix
+
+    def _family(
+        self, lines: List[str], name: str, metric_type: str, help_text: str,
+        unit: str = "",
+    ) -> str:
+        name = f"{self._prefix}_{name}"
+        lines.append(f"# TYPE {name} {metric_type}")
+        if unit:
+            lines.append(f"# UNIT {name} {unit}")
+        lines.append(f"# HELP {name} {help_text}")
+        return name
+
+    @staticmethod
+    def _sample(
+        lines: List[str], name: str, value: float, **labels: Any,
+    ) -> None:
+        if labels:
+            formatted = ",".join(
+                f'{key}="{_escape(str(label))}"'
+                for key, label in labels.items()
+            )
+            lines.append(f"{name}{{{formatted}}} {_format_value(value)}")
+        else:
+            lines.append(f"{name} {_format_value(value)}")
+
+    def _render_histograms(
+        self, lines: List[str], name: str, help_text: str,
+        histograms: Dict[str, Histogram],
+    ) -> None:
+        name = self._family(
+            lines, name, "histogram", help_text, unit="seconds",
+        )
+        for host, histogram in histograms.items():
+            for bound, count in histogram.cumulative():
+                self._sample(
+                    lines, f"{name}_bucket", count,
+                    host=host, le=_format_value(bound),
+                )
+            self._sample(lines, f"{name}_count", histogram.count, host=host)
+            self._sample(lines, f"{name}_sum", histogram.sum, host=host)
+
+    def _render_hasql(self, lines: List[str]) -> None:
+        metrics = self._pool_manager._metrics
+
+        name = self._family(
+            lines, "get_pool", "counter", "Pools chosen by the balancer",
+        )
+        self._sample(lines, f"{name}_total", metrics._pool)
+        name = self._family(
+            lines, "get_pool_seconds", "counter",
+            "Time spent choosing pools", unit="seconds",
+        )
+        self._sample(lines, f"{name}_total", metrics._pool_time)
+
+        name = self._family(
+            lines, "acquire", "counter", "Connections acquired from pools",
+        )
+        for host, count in metrics._acquire.items():
+            self._sample(lines, f"{name}_total", count, host=host)
+
+        self._render_histograms(
+            lines, "get_pool_duration_seconds",
+            "Time spent choosing pools, by the chosen host",
+            metrics._get_pool_histogram,
+        )
+        self._render_histograms(
+            lines, "acquire_duration_seconds",
+            "Time spent acquiring connections from driver pools",
+            metrics._acquire_histogram,
+        )
+
+        name = self._family(
+            lines, "connections_added", "counter",
+            "Connections handed out to the application",
+        )
+        for host, count in metrics._add_connections.items():
+            self._sample(lines, f"{name}_total", count, host=host)
+        name = self._family(
+            lines, "connections_removed", "counter",
+            "Connections returned by the application",
+        )
+        for host, count in metrics._remove_connections.items():
+            self._sample(lines, f"{name}_total", count, host=host)
+        name = self._family(
+            lines, "hedges", "counter",
+            "Hedged acquires started, by the host of the second replica",
+        )
+        for host, count in metrics._hedges.items():
+            self._sample(lines, f"{name}_total", count, host=host)
+        name = self._family(
+            lines, "release_timeouts", "counter",
+            "Connections terminated after their release timed out",
+        )
+        for host, count in metrics._release_timeouts.items():
+            self._sample(lines, f"{name}_total", count, host=host)
+
+    def _render_drivers(self, lines: List[str]) -> None:
+        drivers = self._pool_manager._driver_metrics()
+        for attribute, help_text in (
+            ("max", "Maximum size of the driver pool"),
+            ("min", "Minimum size of the driver pool"),
+            ("idle", "Idle connections in the driver pool"),
+            ("used", "Used connections in the driver pool"),
+        ):
+            name = self._family(
+                lines, f"driver_pool_{attribute}", "gauge", help_text,
+            )
+            for driver in drivers:
+                self._sample(
+                    lines, name, getattr(driver, attribute), host=driver.host,
+                )
+
+    def _render_pools(self, lines: List[str]) -> None:
+        pool_manager = self._pool_manager
+        pools = [
+            (pool_manager.host(pool), pool)
+            for pool in pool_manager.pools
+            if pool is not None
+        ]
+
+        name = self._family(
+            lines, "pool_role", "stateset", "Current role of the host",
+        )
+        for host, pool in pools:
+            current = self._pool_role(pool)
+            for role in self.pool_roles:
+                self._sample(
+                    lines, name, int(role == current),
+                    host=host, **{name: role},
+                )
+
+        name = self._family(
+            lines, "pool_inflight", "gauge",
+            "Connections acquired through hasql and not released yet",
+        )
+        for host, pool in pools:
+            self._sample(
+                lines, name, pool_manager.get_pool_inflight(pool), host=host,
+            )
+
+        self._render_pool_checks(lines, pools)
+
+    def _pool_role(self, pool: Any) -> str:
+        pool_manager = self._pool_manager
+        if pool_manager.is_pool_quarantined(pool):
+            return "quarantined"
+        if pool_manager.pool_is_master(pool):
+            return "master"
+        if pool_manager.pool_is_replica(pool):
+            if pool_manager.is_pool_ejected(pool):
+                return "ejected"
+            return "replica"
+        # Not checked yet or the last check has failed
+        return "unavailable"
+
+    def _render_pool_checks(
+        self, lines: List[str], pools: List[Tuple[str, Any]],
+    ) -> None:
+        pool_manager = self._pool_manager
+        name = self._family(
+            lines, "pool_replication_lag_seconds", "gauge",
+            "Replication lag of the host measured by the last check",
+            unit="seconds",
+        )
+        for host, pool in pools:
+            lag = pool_manager.get_pool_replication_lag(pool)
+            if lag is not None:
+                self._sample(lines, name, lag, host=host)
+
+        name = self._family(
+            lines, "pool_backends", "gauge",
+            "Backends connected to the database of the host by the last "
+            "check",
+        )
+        for host, pool in pools:
+            status = pool_manager.get_pool_host_status(pool)
+            if status is not None and status.backends is not None:
+                self._sample(lines, name, status.backends, host=host)
+
+        name = self._family(
+            lines, "pool_check_duration_seconds", "summary",
+            "Duration of the role checks of the host", unit="seconds",
+        )
+        for host, pool in pools:
+            for quantile in self.response_time_quantiles:
+                value = pool_manager.get_last_response_time(pool, quantile)
+                if value is None:
+                    break
+                self._sample(
+                    lines, name, value, host=host, quantile=quantile,
+                )
+
+    def render(self) -> str:
+        lines: List[str] = []
+        self._render_hasql(lines)
+        self._render_drivers(lines)
+        self._render_pools(lines)
+        lines.append("# EOF\n")
+        return "\n".join(lines)
+
+
+__all__ = (
+    "CalculateMetrics",
+    "DriverMetrics",
+    "HasqlMetrics",
+    "Histogram",
+    "Metrics",
+    "NO_HOST",
+    "OPENMETRICS_CONTENT_TYPE",
+    "OpenMetricsExporter",
+)
@@ -0,0 +1,216 @@
+import logging
+import statistics
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING, Any, Callable, DefaultDict, Dict, List, Optional, Set,
+)
+
+from .utils import Stopwatch
+
+
+if TYPE_CHECKING:
+    from .base import BasePoolManager
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutlierDetection:
+    """Settings of the replica outlier detection.
+
+    Every ``interval`` seconds a replica is ejected when its acquire or role
+    check ``latency_percentile`` exceeds ``latency_factor`` times the median
+    of the other replicas (and ``min_latency``), or when at least
+    ``error_rate`` of its acquires has failed. Acquires are judged only
+    within the interval and only for replicas which have served
+    ``min_requests`` or more of them.
+    """
+
+    interval: float = 10.
+    latency_factor: float = 3.
+    latency_percentile: float = 0.99
+    min_latency: float = 0.005
+    error_rate: float = 0.5
+    min_requests: int = 10
+    base_ejection_time: float = 30.
+    max_ejection_time: float = 300.
+    max_ejection_percent: int = 50
+    window_size: int = 128
+
+    def __post_init__(self):
+        if self.interval <= 0:
+            raise ValueError("interval must be positive")
+        if self.latency_factor < 1:
+            raise ValueError("latency_factor must not be less than 1")
+        if not 0 <= self.latency_percentile <= 1:
+            raise ValueError(
+                "latency_percentile must belong to the segment [0; 1]",
+            )
+        if not 0 < self.error_rate <= 1:
+            raise ValueError("error_rate must belong to the segment (0; 1]")
+        if self.base_ejection_time <= 0:
+            raise ValueError("base_ejection_time must be positive")
+        if self.max_ejection_time < self.base_ejection_time:
+            raise ValueError(
+                "max_ejection_time must not be less than base_ejection_time",
+            )
+        if not 0 <= self.max_ejection_percent <= 100:
+            raise ValueError(
+                "max_ejection_percent must belong to the segment [0; 100]",
+            )
+
+
+class OutlierDetector:
+    """Keeps acquire statistics of pools and decides which replicas are
+    ejected from the candidates of balancer policies.
+
+    A pool ejected again is kept out for ``base_ejection_time`` multiplied by
+    the number of its recent ejections, up to ``max_ejection_time``. Every
+    interval the pool stays healthy decreases the multiplier by one.
+    """
+
+    def __init__(
+        self,
+        pool_manager: "BasePoolManager",
+        settings: OutlierDetection,
+    ):
+        self._pool_manager = pool_manager
+        self._settings = settings
+        self._acquire_stopwatch = Stopwatch(window_size=settings.window_size)
+        self._requests: DefaultDict[Any, int] = defaultdict(int)
+        self._errors: DefaultDict[Any, int] = defaultdict(int)
+        self._ejected_until: Dict[Any, float] = {}
+        self._ejections: Dict[Any, int] = {}
+
+    @property
+    def settings(self) -> OutlierDetection:
+        return self._settings
+
+    def is_ejected(self, pool) -> bool:
+        return pool in self._ejected_until
+
+    def add_acquire(self, pool, elapsed: float):
+        self._acquire_stopwatch.add(pool, elapsed)
+        self._requests[pool] += 1
+
+    def add_error(self, pool):
+        self._errors[pool] += 1
+
+    def _latency_outliers(
+        self,
+        pools: List[Any],
+        get_time: Callable[[Any, float], Optional[float]],
+    ) -> Set[Any]:
+        times = {}
+        for pool in pools:
+            value = get_time(pool, self._settings.latency_percentile)
+            if value is not None:
+                times[pool] = value
+
+        outliers = set()
+        for pool, value in times.items():
+            if value < self._settings.min_latency:
+                continue
+            others = [other for key, other in times.items() if key is not pool]
+            if not others:
+                continue
+            if value > self._settings.latency_factor * statistics.median(
+                others,
+            ):
+                outliers.add(pool)
+        return outliers
+
+    def _error_outliers(self, pools: List[Any]) -> Set[Any]:
+        outliers = set()
+        for pool in pools:
+            requests = self._requests.get(pool, 0)
+            if requests < self._settings.min_requests:
+                continue
+            error_rate = self._errors.get(pool, 0) / requests
+            if error_rate >= self._settings.error_rate:
+                outliers.add(pool)
+        return outliers
+
+    def evaluate(self) -> bool:
+        """Returns pools whose ejection time is over and ejects new
+        outliers. Returns whether the set of ejected pools has changed."""
+        now = time.monotonic()
+        changed = False
+        for pool, ejected_until in tuple(self._ejected_until.items()):
+            if ejected_until <= now:
+                del self._ejected_until[pool]
+                changed = True
+
+        pool_manager = self._pool_manager
+        replicas = [
+            pool for pool in pool_manager.pools
+            if pool is not None and pool_manager.pool_is_replica(pool)
+        ]
+        healthy = [pool for pool in replicas if not self.is_ejected(pool)]
+        # A few slow acquires of an idle replica, e.g. the handshakes of
+        # new connections, say nothing about its latency
+        busy = [
+            pool for pool in healthy
+            if self._requests.get(pool, 0) >= self._settings.min_requests
+        ]
+        outliers = (
+            self._latency_outliers(
+                busy, self._acquire_stopwatch.get_time,
+            ) |
+            self._latency_outliers(
+                healthy, pool_manager.get_last_response_time,
+            ) |
+            self._error_outliers(healthy)
+        )
+        self._requests.clear()
+        self._errors.clear()
+        # Like the counters, acquire times are judged within the interval,
+        # so samples of the slow period don't eject a replica on return
+        self._acquire_stopwatch = Stopwatch(
+            window_size=self._settings.window_size,
+        )
+
+        for pool in healthy:
+            if pool in outliers or pool not in self._ejections:
+                continue
+            self._ejections[pool] -= 1
+            if not self._ejections[pool]:
+                del self._ejections[pool]
+
+        max_ejected = len(replicas) * self._settings.max_ejection_percent // 100
+        ejected = len(replicas) - len(healthy)
+        for pool in healthy:
+            if pool not in outliers:
+                continue
+            if ejected >= max_ejected:
+                logger.warning(
+                    "Replica %s is an outlier, but %d%% of replicas "
+                    "are ejected already",
+                    pool_manager.host(pool),
+                    self._settings.max_ejection_percent,
+                )
+                break
+            ejections = self._ejections.get(pool, 0) + 1
+            self._ejections[pool] = ejections
+            ejection_time = min(
+                self._settings.base_ejection_time * ejections,
+                self._settings.max_ejection_time,
+            )
+            self._ejected_until[pool] = now + ejection_time
+            ejected += 1
+            changed = True
+            logger.warning(
+                "Replica %s has been ejected as an outlier for %.1f sec",
+                pool_manager.host(pool),
+                ejection_time,
+            )
+        return changed
+
+
+__all__ = (
+    "OutlierDetection",
+    "OutlierDetector",
+)
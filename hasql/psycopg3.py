@@ -2,7 +2,7 @@ from typing import Optional, Sequence
 
 from psycopg import AsyncConnection, errors
 from psycopg.conninfo import conninfo_to_dict
-from psycopg_pool import AsyncConnectionPool
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 
 from .base import BasePoolManager
 from .metrics import DriverMetrics
@@ -40,6 +40,7 @@ class PoolAcquireContext:
 
 class PoolManager(BasePoolManager):
     pools: Sequence[AsyncConnectionPool]
+    _pool_min_size_kwarg = "min_size"
 
     def _prepare_acquire_kwargs(
         self,
@@ -50,8 +51,25 @@ class PoolManager(BasePoolManager):
         prepared_kwargs["timeout"] = timeout
         return prepared_kwargs
 
+    def _is_acquire_timeout(self, error: Exception) -> bool:
+        return super()._is_acquire_timeout(error) or isinstance(
+            error, PoolTimeout,
+        )
+
+    def _is_connection_error(self, error: Exception) -> bool:
+        return super()._is_connection_error(error) or isinstance(
+            error, (errors.OperationalError, errors.InterfaceError),
+        )
+
+    # Balancer policies read these for every candidate on each acquire.
+    # get_stats() reports both values, but merges the counters and the
+    # measures into a new dict on every call, so the underlying deques
+    # are read directly.
     def get_pool_freesize(self, pool: AsyncConnectionPool):
-        return pool.get_stats()["pool_available"]
+        return len(pool._pool)
+
+    def get_pool_waiters(self, pool: AsyncConnectionPool) -> int:
+        return len(pool._waiting)
 
     def acquire_from_pool(self, pool: AsyncConnectionPool, **kwargs):
         return PoolAcquireContext(pool, **kwargs)
@@ -64,32 +82,65 @@ class PoolManager(BasePoolManager):
     ):
         return await pool.putconn(connection)
 
-    async def _is_master(self, connection: AsyncConnection):
+    async def _fetchrow(self, connection: AsyncConnection, query: str):
         async with connection.cursor() as cur:
-            await cur.execute("SHOW transaction_read_only")
-            return (await cur.fetchone())[0] == "off"       # type: ignore
+            await cur.execute(query)
+            return await cur.fetchone()
+
+    async def _fetch_host_status(
+        self, connection: AsyncConnection, query: str,
+    ):
+        row = await self._fetchrow(connection, query)
+        await connection.commit()
+        return row
 
     async def _pool_factory(self, dsn: Dsn) -> AsyncConnectionPool:
         pool = AsyncConnectionPool(
-            str(dsn), **self.pool_factory_kwargs
+            str(dsn), **self.pool_factory_kwargs_for(dsn)
         )
         await pool.wait()
         return pool
 
     def _prepare_pool_factory_kwargs(self, kwargs: dict) -> dict:
-        kwargs["min_size"] = kwargs.get("min_size", 1) + 1
-        kwargs["max_size"] = kwargs.get("max_size", 10) + 1
+        kwargs["min_size"] = (
+            kwargs.get("min_size", 1) + self._pool_reserved_size
+        )
+        kwargs["max_size"] = (
+            kwargs.get("max_size", 10) + self._pool_reserved_size
+        )
         return kwargs
 
+    async def _warm_up_pool(self, pool: AsyncConnectionPool):
+        # The workers of the pool open the missing connections by themselves
+        await pool.resize(
+            self.pool_factory_kwargs["min_size"],
+            self.pool_factory_kwargs["max_size"],
+        )
+
     async def _close(self, pool: AsyncConnectionPool):
         await pool.close()
 
     async def _terminate(self, pool: AsyncConnectionPool):
-        pass
+        # psycopg_pool has no terminate: the workers are stopped at once,
+        # connections still in use are closed when they are returned
+        await pool.close(timeout=0)
 
     def is_connection_closed(self, connection):
         return connection.closed
 
+    async def _connect_probe(self, pool: AsyncConnectionPool, dsn: Dsn):
+        # The pool opens its connections with the arguments passed as kwargs
+        pool_kwargs = self._pool_factory_kwargs
+        connect_kwargs = dict(pool_kwargs.get("kwargs") or {})
+        connect_kwargs["autocommit"] = True
+        connection_class = pool_kwargs.get(
+            "connection_class", AsyncConnection,
+        )
+        return await connection_class.connect(str(dsn), **connect_kwargs)
+
+    async def _close_probe(self, connection: AsyncConnection):
+        await connection.close()
+
     def host(self, pool: AsyncConnectionPool):
         conninfo = pool.conninfo
         if not isinstance(conninfo, str):
@@ -0,0 +1,73 @@
+import random
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict
+
+from .utils import Dsn
+
+
+if TYPE_CHECKING:
+    from .base import BasePoolManager
+
+
+class AbstractRefreshScheduler(ABC):
+    """Decides how long the background task of a host sleeps between checks.
+
+    Every check ends with a call of one of the methods, which returns the
+    delay (in seconds) before the next check of the same host.
+    """
+
+    def __init__(self, pool_manager: "BasePoolManager"):
+        self._pool_manager = pool_manager
+
+    @abstractmethod
+    def on_check_succeeded(self, dsn: Dsn, role_changed: bool) -> float:
+        pass
+
+    @abstractmethod
+    def on_check_failed(self, dsn: Dsn) -> float:
+        pass
+
+
+class AdaptiveRefreshScheduler(AbstractRefreshScheduler):
+    """Checks hosts every ``refresh_delay`` right after a role change and
+    doubles the delay up to ``max_refresh_delay`` while the role stays the
+    same. Unreachable hosts are retried with exponential backoff within the
+    same bounds. Delays above ``refresh_delay`` are jittered, so that many
+    processes don't check a recovering host at the same moment.
+
+    With ``max_refresh_delay`` equal to ``refresh_delay`` (the default) every
+    host is checked with the fixed cadence.
+    """
+
+    def __init__(self, pool_manager: "BasePoolManager"):
+        super().__init__(pool_manager)
+        self._successes: Dict[Dsn, int] = {}
+        self._failures: Dict[Dsn, int] = {}
+
+    def _delay(self, attempt: int) -> float:
+        min_delay = self._pool_manager.refresh_delay
+        max_delay = self._pool_manager.max_refresh_delay
+        # Exponent is bounded to keep the float finite on long outages
+        delay = min(min_delay * 2 ** min(attempt, 32), max_delay)
+        if delay <= min_delay:
+            return min_delay
+        return random.uniform(max(min_delay, delay / 2), delay)
+
+    def on_check_succeeded(self, dsn: Dsn, role_changed: bool) -> float:
+        self._failures.pop(dsn, None)
+        if role_changed:
+            self._successes[dsn] = 0
+        else:
+            self._successes[dsn] = self._successes.get(dsn, 0) + 1
+        return self._delay(self._successes[dsn])
+
+    def on_check_failed(self, dsn: Dsn) -> float:
+        self._successes.pop(dsn, None)
+        self._failures[dsn] = self._failures.get(dsn, 0) + 1
+        return self._delay(self._failures[dsn] - 1)
+
+
+__all__ = (
+    "AbstractRefreshScheduler",
+    "AdaptiveRefreshScheduler",
+)
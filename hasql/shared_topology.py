@@ -0,0 +1,396 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .topology import HostStatus
+from .utils import Dsn
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SHARED_TOPOLOGY_SLOTS: int = 64
+DEFAULT_SHARED_TOPOLOGY_STALE_AFTER: float = 5.0
+DEFAULT_SHARED_TOPOLOGY_REQUEST_POLL_INTERVAL: float = 0.1
+
+# Header: magic, layout version and number of host slots
+_HEADER = struct.Struct("<4sHH")
+_MAGIC = b"HSQL"
+_VERSION = 3
+
+# Slot: sequence, host key, checked at (unix time), state, recovery state,
+# replication lag (NaN for unknown), replay LSN (-1 for unknown), response
+# time and backends (-1 for unknown). The sequence is odd while the
+# publisher writes the slot, readers retry then.
+_SLOT = struct.Struct("<QQdBB6xdqdq")
+_SEQUENCE = struct.Struct("<Q")
+# The slots are followed by a counter of check requests per slot. Readers
+# increment it, the publisher checks the host when it has changed.
+_REQUESTS = struct.Struct("<Q")
+_REQUESTS_MASK = (1 << 64) - 1
+_READ_ATTEMPTS = 16
+
+_STATE_EMPTY = 0
+_STATE_MASTER = 1
+_STATE_REPLICA = 2
+_STATE_UNAVAILABLE = 3
+
+_IN_RECOVERY = {None: 0, False: 1, True: 2}
+_IN_RECOVERY_VALUES = {value: key for key, value in _IN_RECOVERY.items()}
+
+
+def _host_key(dsn: Dsn) -> int:
+    digest = hashlib.blake2b(dsn.netloc.encode(), digest_size=8).digest()
+    # Zero marks an empty slot
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedTopology:
+    """Statuses of hosts in a fixed-layout memory mapped file shared by
+    the processes of a host, e.g. the workers of a pre-fork server.
+
+    The pool manager created with ``publisher=True`` writes the status of
+    every check of its hosts. Pool managers of the other processes take the
+    statuses from the file instead of querying the hosts while the statuses
+    are younger than ``stale_after`` seconds, and check the hosts themselves
+    otherwise. Checks requested by the readers, e.g. after an acquire error,
+    are picked up by the publisher every ``request_poll_interval`` seconds.
+    There must be a single publisher per file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        publisher: bool = False,
+        slots: int = DEFAULT_SHARED_TOPOLOGY_SLOTS,
+        stale_after: float = DEFAULT_SHARED_TOPOLOGY_STALE_AFTER,
+        request_poll_interval: float = (
+            DEFAULT_SHARED_TOPOLOGY_REQUEST_POLL_INTERVAL
+        ),
+    ):
+        if slots < 1:
+            raise ValueError("slots must be positive")
+        if stale_after <= 0:
+            raise ValueError("stale_after must be positive")
+        if request_poll_interval <= 0:
+            raise ValueError("request_poll_interval must be positive")
+        self._path = path
+        self._publisher = publisher
+        self._slots = slots
+        self._stale_after = stale_after
+        self._request_poll_interval = request_poll_interval
+        self._mmap: Optional[mmap.mmap] = None
+        self._writable = publisher
+        # Slot and the last seen number of check requests of every host
+        # written by the publisher
+        self._requests_seen: Dict[Dsn, Tuple[int, int]] = {}
+        self._inode: Optional[int] = None
+        self._stale: Set[Dsn] = set()
+        if publisher:
+            self._create()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def publisher(self) -> bool:
+        return self._publisher
+
+    @property
+    def stale_after(self) -> float:
+        return self._stale_after
+
+    @property
+    def request_poll_interval(self) -> float:
+        return self._request_poll_interval
+
+    def _size(self) -> int:
+        return _HEADER.size + (_SLOT.size + _REQUESTS.size) * self._slots
+
+    def _create(self):
+        # Readers of the previous publisher may still have the file mapped,
+        # truncating it would crash them with SIGBUS. A file of the same
+        # layout is reused, otherwise a new one replaces it, and the readers
+        # attach to it once their statuses get stale.
+        if self._reuse():
+            return
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, self._size())
+            buffer = mmap.mmap(fd, self._size())
+            inode = os.fstat(fd).st_ino
+        finally:
+            os.close(fd)
+        _HEADER.pack_into(buffer, 0, _MAGIC, _VERSION, self._slots)
+        os.replace(tmp_path, self._path)
+        self._mmap = buffer
+        self._inode = inode
+
+    def _reuse(self) -> bool:
+        try:
+            fd = os.open(self._path, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            stat = os.fstat(fd)
+            if stat.st_size != self._size():
+                return False
+            buffer = mmap.mmap(fd, self._size())
+        finally:
+            os.close(fd)
+        if _HEADER.unpack_from(buffer, 0) != (_MAGIC, _VERSION, self._slots):
+            buffer.close()
+            return False
+        self._mmap = buffer
+        self._inode = stat.st_ino
+        return True
+
+    def _attach(self) -> Optional[mmap.mmap]:
+        # The publisher may start after the readers, so attaching is
+        # retried on every read until the file appears
+        if self._mmap is not None:
+            return self._mmap
+        # Readers write their check requests, a read-only file disables them
+        self._writable = True
+        try:
+            fd = os.open(self._path, os.O_RDWR)
+        except PermissionError:
+            self._writable = False
+            try:
+                fd = os.open(self._path, os.O_RDONLY)
+            except FileNotFoundError:
+                return None
+        except FileNotFoundError:
+            return None
+        try:
+            stat = os.fstat(fd)
+            size = stat.st_size
+            if size < _HEADER.size:
+                return None
+            buffer = mmap.mmap(
+                fd,
+                size,
+                access=mmap.ACCESS_WRITE if self._writable
+                else mmap.ACCESS_READ,
+            )
+        finally:
+            os.close(fd)
+        magic, version, slots = _HEADER.unpack_from(buffer, 0)
+        if (
+            magic != _MAGIC or version != _VERSION or
+            size < _HEADER.size + (_SLOT.size + _REQUESTS.size) * slots
+        ):
+            buffer.close()
+            logger.warning("File %s is not a shared topology", self._path)
+            return None
+        self._slots = slots
+        self._mmap = buffer
+        self._inode = stat.st_ino
+        return buffer
+
+    def _detach_replaced(self) -> bool:
+        """Drops the mapping of a file replaced by a restarted publisher,
+        returns whether there is a new file to attach to."""
+        if self._publisher or self._mmap is None:
+            return False
+        try:
+            inode = os.stat(self._path).st_ino
+        except FileNotFoundError:
+            return False
+        if inode == self._inode:
+            return False
+        self.close()
+        return True
+
+    def _offset(self, index: int) -> int:
+        return _HEADER.size + _SLOT.size * index
+
+    def _requests_offset(self, index: int) -> int:
+        return (
+            _HEADER.size + _SLOT.size * self._slots + _REQUESTS.size * index
+        )
+
+    def _find_slot(self, buffer: mmap.mmap, key: int) -> Optional[int]:
+        """Returns the slot of the host or the empty slot it belongs to,
+        None when the file is full."""
+        start = key % self._slots
+        for step in range(self._slots):
+            index = (start + step) % self._slots
+            slot_key = _SLOT.unpack_from(buffer, self._offset(index))[1]
+            if slot_key in (key, 0):
+                return index
+        return None
+
+    def write(
+        self,
+        dsn: Dsn,
+        status: Optional[HostStatus],
+        checked_at: float,
+    ):
+        """Writes the status of the host, None means the host is not
+        available. ``checked_at`` is the unix time the check started."""
+        assert self._publisher and self._mmap is not None
+        key = _host_key(dsn)
+        index = self._find_slot(self._mmap, key)
+        if index is None:
+            logger.warning(
+                "Shared topology %s has no free slot for %s",
+                self._path,
+                dsn.netloc,
+            )
+            return
+
+        if status is None:
+            status = HostStatus(is_master=False)
+            state = _STATE_UNAVAILABLE
+        else:
+            state = _STATE_MASTER if status.is_master else _STATE_REPLICA
+        lag = (
+            math.nan if status.replication_lag is None
+            else status.replication_lag
+        )
+        replay_lsn = -1 if status.replay_lsn is None else status.replay_lsn
+        backends = -1 if status.backends is None else status.backends
+
+        if dsn not in self._requests_seen:
+            requests = _REQUESTS.unpack_from(
+                self._mmap, self._requests_offset(index),
+            )[0]
+            self._requests_seen[dsn] = (index, requests)
+
+        offset = self._offset(index)
+        sequence = _SEQUENCE.unpack_from(self._mmap, offset)[0]
+        # A publisher stopped in the middle of a write leaves it odd
+        sequence += sequence % 2
+        _SEQUENCE.pack_into(self._mmap, offset, sequence + 1)
+        _SLOT.pack_into(
+            self._mmap, offset, sequence + 1, key, checked_at, state,
+            _IN_RECOVERY[status.in_recovery], lag, replay_lsn,
+            status.response_time, backends,
+        )
+        _SEQUENCE.pack_into(self._mmap, offset, sequence + 2)
+
+    def requested_checks(self) -> List[Dsn]:
+        """Returns the hosts written by the publisher whose check has been
+        requested by readers since the previous call."""
+        assert self._publisher
+        if self._mmap is None:
+            return []
+        requested = []
+        for dsn, (index, seen) in self._requests_seen.items():
+            requests = _REQUESTS.unpack_from(
+                self._mmap, self._requests_offset(index),
+            )[0]
+            if requests != seen:
+                self._requests_seen[dsn] = (index, requests)
+                requested.append(dsn)
+        return requested
+
+    def request_check(self, dsn: Dsn) -> bool:
+        """Asks the publisher to check the host without waiting for its
+        refresh delay. Returns False when the publisher has not written the
+        host yet or the file is read-only."""
+        assert not self._publisher
+        buffer = self._attach()
+        if buffer is None or not self._writable:
+            return False
+        key = _host_key(dsn)
+        index = self._find_slot(buffer, key)
+        if index is None:
+            return False
+        values = self._read_slot(buffer, index)
+        if values is None or values[0] != key:
+            return False
+        # Increments of concurrent readers may overlap, either of them
+        # still changes the counter the publisher has seen
+        offset = self._requests_offset(index)
+        requests = _REQUESTS.unpack_from(buffer, offset)[0]
+        _REQUESTS.pack_into(buffer, offset, (requests + 1) & _REQUESTS_MASK)
+        return True
+
+    def _read_slot(
+        self, buffer: mmap.mmap, index: int,
+    ) -> Optional[Tuple[int, float, int, int, float, int, float, int]]:
+        offset = self._offset(index)
+        for _ in range(_READ_ATTEMPTS):
+            values = _SLOT.unpack_from(buffer, offset)
+            sequence = values[0]
+            if sequence % 2:
+                continue
+            if _SEQUENCE.unpack_from(buffer, offset)[0] == sequence:
+                return values[1:]
+        return None
+
+    def read(self, dsn: Dsn) -> Optional[Tuple[float, Optional[HostStatus]]]:
+        """Returns the unix time the last check of the host started and its
+        status (None when the host is not available), or None when there is
+        no status younger than ``stale_after``."""
+        record = self._read(dsn)
+        if record is None and self._detach_replaced():
+            record = self._read(dsn)
+        if record is None:
+            if dsn not in self._stale:
+                self._stale.add(dsn)
+                logger.warning(
+                    "Shared topology %s has no recent status of %s, "
+                    "checking the host locally",
+                    self._path,
+                    dsn.netloc,
+                )
+        else:
+            self._stale.discard(dsn)
+        return record
+
+    def _read(self, dsn: Dsn) -> Optional[Tuple[float, Optional[HostStatus]]]:
+        buffer = self._attach()
+        if buffer is None:
+            return None
+        key = _host_key(dsn)
+        index = self._find_slot(buffer, key)
+        if index is None:
+            return None
+        values = self._read_slot(buffer, index)
+        if values is None:
+            return None
+        (
+            slot_key, checked_at, state, in_recovery, lag, replay_lsn,
+            response_time, backends,
+        ) = values
+        if (
+            slot_key != key or
+            state == _STATE_EMPTY or
+            time.time() - checked_at > self._stale_after
+        ):
+            return None
+        if state == _STATE_UNAVAILABLE:
+            return checked_at, None
+        return checked_at, HostStatus(
+            is_master=state == _STATE_MASTER,
+            replication_lag=None if math.isnan(lag) else lag,
+            replay_lsn=None if replay_lsn < 0 else replay_lsn,
+            response_time=response_time,
+            in_recovery=_IN_RECOVERY_VALUES[in_recovery],
+            backends=None if backends < 0 else backends,
+        )
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._inode = None
+            self._requests_seen.clear()
+
+
+__all__ = (
+    "DEFAULT_SHARED_TOPOLOGY_REQUEST_POLL_INTERVAL",
+    "DEFAULT_SHARED_TOPOLOGY_SLOTS",
+    "DEFAULT_SHARED_TOPOLOGY_STALE_AFTER",
+    "SharedTopology",
+)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from .utils import Dsn
+
+
+if TYPE_CHECKING:
+    from .base import BasePoolManager
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HostStatus:
+    """Result of a single check of a host."""
+
+    is_master: bool
+    replication_lag: Optional[float] = None
+    replay_lsn: Optional[int] = None
+    response_time: float = 0.
+    # Whether the host is a standby, a primary with read only transactions
+    # by default is not a master either
+    in_recovery: Optional[bool] = None
+    # Backends connected to the database of the host
+    backends: Optional[int] = None
+    # Value of the probe_expression of the pool manager
+    expression: Any = None
+
+
+# Subscribed pool managers of a host mapped to their pools and the events
+# which hand the checks over to them, in the order of subscription
+_Subscribers = Dict["BasePoolManager", Tuple[Any, asyncio.Event]]
+
+
+class TopologyMonitor:
+    """Shares checks of hosts between pool managers of the same event loop.
+
+    Only the first manager subscribed to a host checks it with the system
+    connection of its own pool. The statuses it gets are published to the
+    other subscribers, which keep their own driver pools but don't open
+    system connections. When the checking manager is closed, the next
+    subscriber takes the checks over. A host is forgotten when its last
+    subscriber is gone.
+    """
+
+    def __init__(self):
+        self._hosts: Dict[Dsn, _Subscribers] = {}
+
+    def subscribers_count(self, dsn: Dsn) -> int:
+        return len(self._hosts.get(dsn, ()))
+
+    def is_checking(self, dsn: Dsn, pool_manager: "BasePoolManager") -> bool:
+        subscribers = self._hosts.get(dsn)
+        if not subscribers:
+            return False
+        return next(iter(subscribers)) is pool_manager
+
+    async def watch(self, dsn: Dsn, pool_manager: "BasePoolManager", pool):
+        """Subscribes the pool of the manager to the statuses of the host
+        until the task is cancelled or the manager is closed."""
+        subscribers = self._hosts.setdefault(dsn, {})
+        takeover = asyncio.Event()
+        subscribers[pool_manager] = (pool, takeover)
+        try:
+            if not self.is_checking(dsn, pool_manager):
+                await takeover.wait()
+                logger.debug(
+                    "Taking over checks of dsn=%s",
+                    dsn.with_(password="******"),
+                )
+            await pool_manager._check_pool(pool, dsn)
+        finally:
+            was_checking = self.is_checking(dsn, pool_manager)
+            del subscribers[pool_manager]
+            if not subscribers:
+                del self._hosts[dsn]
+            elif was_checking:
+                _, next_takeover = next(iter(subscribers.values()))
+                next_takeover.set()
+
+    async def publish(
+        self,
+        dsn: Dsn,
+        publisher: "BasePoolManager",
+        status: Optional[HostStatus],
+        started_at: float,
+    ):
+        """Passes the status of the host checked at ``started_at`` to the
+        subscribers except the publisher, None means the host is not
+        available."""
+        for pool_manager, (pool, _) in tuple(self._hosts.get(dsn, {}).items()):
+            if pool_manager is publisher or pool_manager.closing:
+                continue
+            await pool_manager._receive_host_status(
+                pool, dsn, status, started_at,
+            )
+
+    def request_check(self, dsn: Dsn):
+        """Wakes up the manager checking the host, e.g. after an acquire
+        error in any of the subscribers."""
+        subscribers = self._hosts.get(dsn)
+        if subscribers:
+            next(iter(subscribers))._dsn_recheck_event[dsn].set()
+
+
+_topology_monitors: (
+    "WeakKeyDictionary[asyncio.AbstractEventLoop, TopologyMonitor]"
+) = WeakKeyDictionary()
+
+
+def get_topology_monitor() -> TopologyMonitor:
+    """Returns the process-wide monitor of the running event loop."""
+    loop = asyncio.get_running_loop()
+    monitor = _topology_monitors.get(loop)
+    if monitor is None:
+        monitor = _topology_monitors[loop] = TopologyMonitor()
+    return monitor
+
+
+__all__ = (
+    "HostStatus",
+    "TopologyMonitor",
+    "get_topology_monitor",
+)
@@ -1,6 +1,7 @@
+import bisect
 import io
+import math
 import re
-import statistics
 import time
 from collections import defaultdict, deque
 from contextlib import contextmanager
@@ -297,26 +298,119 @@ def split_dsn(dsn: Union[Dsn, str], default_port: int = 5432) -> List[Dsn]:
     )
 
 
+def parse_lsn(lsn: str) -> int:
+    """Convert a textual PostgreSQL LSN (e.g. ``16/B374D848``) to int."""
+    high, low = lsn.split("/", 1)
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def format_lsn(lsn: int) -> str:
+    """Convert an int LSN back to the PostgreSQL textual representation."""
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+
+class SlidingWindow:
+    """The last ``size`` samples kept both in arrival and in sorted order.
+
+    Adding a sample costs a binary search plus a memmove of at most
+    ``size`` pointers, any percentile is then read in O(1).
+    """
+
+    __slots__ = ("_samples", "_sorted")
+
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._sorted: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, sample: float) -> None:
+        if len(self._samples) == self._samples.maxlen:
+            oldest = self._samples[0]
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._samples.append(sample)
+        bisect.insort(self._sorted, sample)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Linearly interpolated percentile, ``0.5`` is the median."""
+        if not 0 <= percentile <= 1:
+            raise ValueError("percentile must belong to the segment [0; 1]")
+        if not self._sorted:
+            return None
+        position = percentile * (len(self._sorted) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(self._sorted) - 1)
+        return self._sorted[lower] + (
+            (self._sorted[upper] - self._sorted[lower]) * (position - lower)
+        )
+
+
 class Stopwatch:
     def __init__(self, window_size: int):
-        self._times: DefaultDict[Any, Deque] = defaultdict(
-            lambda: deque(maxlen=window_size),
+        self._times: DefaultDict[Any, SlidingWindow] = defaultdict(
+            lambda: SlidingWindow(window_size),
         )
-        self._cache: Dict[Any, Optional[int]] = {}
 
-    def get_time(self, obj: Any) -> Optional[float]:
+    def get_time(self, obj: Any, percentile: float = 0.5) -> Optional[float]:
         if obj not in self._times:
             return None
-        if self._cache.get(obj) is None:
-            self._cache[obj] = statistics.median(self._times[obj])
-        return self._cache[obj]
+        return self._times[obj].percentile(percentile)
+
+    def add(self, obj: Any, elapsed: float) -> None:
+        self._times[obj].add(elapsed)
+
+    def reset(self, obj: Any) -> None:
+        self._times.pop(obj, None)
 
     @contextmanager
     def __call__(self, obj: Any) -> Generator[None, None, None]:
         start_at = time.monotonic()
         yield
-        self._times[obj].append(time.monotonic() - start_at)
-        self._cache[obj] = None
+        self.add(obj, time.monotonic() - start_at)
+
 
+class Ewma:
+    """Time-decayed exponentially weighted moving average per object.
 
-__all__ = ("Dsn", "split_dsn", "Stopwatch", "host_is_ipv6_address")
+    The weight of the previous value decays as ``exp(-elapsed / decay_time)``,
+    so samples that arrive in bursts do not outweigh the history, and the
+    value itself fades towards zero when no samples arrive. The latter lets
+    a penalised pool receive traffic again after it recovers.
+    """
+
+    def __init__(self, decay_time: float):
+        if decay_time <= 0:
+            raise ValueError("decay_time must be positive")
+        self._decay_time = decay_time
+        self._values: Dict[Any, Tuple[float, float]] = {}
+
+    def _decay(self, updated_at: float, now: float) -> float:
+        return math.exp(-max(now - updated_at, 0.0) / self._decay_time)
+
+    def get(self, obj: Any) -> Optional[float]:
+        if obj not in self._values:
+            return None
+        value, updated_at = self._values[obj]
+        return value * self._decay(updated_at, time.monotonic())
+
+    def add(self, obj: Any, sample: float) -> None:
+        now = time.monotonic()
+        if obj not in self._values:
+            self._values[obj] = (sample, now)
+            return
+        value, updated_at = self._values[obj]
+        decay = self._decay(updated_at, now)
+        self._values[obj] = (value * decay + sample * (1 - decay), now)
+
+
+__all__ = (
+    "Dsn",
+    "Ewma",
+    "SlidingWindow",
+    "Stopwatch",
+    "format_lsn",
+    "host_is_ipv6_address",
+    "parse_lsn",
+    "split_dsn",
+)
@@ -64,6 +64,19 @@ async def test_terminate(pool_manager):
     assert sqlalchemy_pool.sync_engine.pool.overflow() == -11
 
 
+async def test_close_terminates_stuck_pool(pool_manager):
+    sqlalchemy_pool: AsyncEngine = await pool_manager.balancer.get_pool(
+        read_only=False,
+    )
+    driver_pool = sqlalchemy_pool.sync_engine.pool
+    conn = await pool_manager.acquire_master()
+    assert await pool_manager.close(drain_timeout=0.01) == 1
+    # The disposed engine has replaced its pool with a new empty one
+    assert sqlalchemy_pool.sync_engine.pool is not driver_pool
+    assert sqlalchemy_pool.sync_engine.pool.checkedout() == 0
+    await conn.close()
+
+
 async def test_release(pool_manager):
     sqlalchemy_pool = await pool_manager.balancer.get_pool(read_only=False)
     assert pool_manager.get_pool_freesize(sqlalchemy_pool) == 10
@@ -131,3 +144,18 @@ async def test_async_sessionmaker(
 
         if class_ is not None:
             assert isinstance(session, class_)
+
+
+def test_probe_connect_kwargs():
+    pool_manager = PoolManager.__new__(PoolManager)
+    pool_manager._pool_factory_kwargs = {
+        "pool_size": 11,
+        "max_overflow": 0,
+        "pool_pre_ping": True,
+        "connect_args": {"ssl": "require"},
+        "echo": True,
+    }
+    assert pool_manager._probe_connect_kwargs() == {
+        "connect_args": {"ssl": "require"},
+        "echo": True,
+    }
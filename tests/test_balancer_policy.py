@@ -1,10 +1,13 @@
 import asyncio
+from unittest import mock
 
 import pytest
 from async_timeout import timeout
 
 from hasql.balancer_policy import (
+    EwmaBalancerPolicy,
     GreedyBalancerPolicy,
+    PowerOfTwoChoicesBalancerPolicy,
     RandomWeightedBalancerPolicy,
     RoundRobinBalancerPolicy,
 )
@@ -13,7 +16,9 @@ from tests.mocks import TestPoolManager
 balancer_policies = pytest.mark.parametrize(
     "balancer_policy",
     [
+        EwmaBalancerPolicy,
         GreedyBalancerPolicy,
+        PowerOfTwoChoicesBalancerPolicy,
         RandomWeightedBalancerPolicy,
         RoundRobinBalancerPolicy,
     ],
@@ -61,7 +66,7 @@ async def test_acquire_master(make_pool_manager, balancer_policy):
     pool_manager = await make_pool_manager(balancer_policy)
     async with timeout(1):
         async with pool_manager.acquire_master() as conn:
-            assert await conn.is_master()
+            assert conn._pool.is_master
 
 
 @balancer_policies
@@ -69,7 +74,7 @@ async def test_acquire_replica(make_pool_manager, balancer_policy):
     pool_manager = await make_pool_manager(balancer_policy)
     async with timeout(1):
         async with pool_manager.acquire_replica() as conn:
-            assert not await conn.is_master()
+            assert not conn._pool.is_master
 
 
 @balancer_policies
@@ -80,7 +85,7 @@ async def test_acquire_replica_with_fallback_master(
     pool_manager = await make_pool_manager(balancer_policy, replicas_count=0)
     async with timeout(1):
         async with pool_manager.acquire_replica(fallback_master=True) as conn:
-            assert await conn.is_master()
+            assert conn._pool.is_master
 
 
 @balancer_policies
@@ -90,7 +95,7 @@ async def test_acquire_master_as_replica(make_pool_manager, balancer_policy):
         async with pool_manager.acquire_replica(
             master_as_replica_weight=1.0,
         ) as conn:
-            assert await conn.is_master()
+            assert conn._pool.is_master
 
 
 @balancer_policies
@@ -102,3 +107,229 @@ async def test_dont_acquire_master_as_replica(
     with pytest.raises(asyncio.TimeoutError):
         async with pool_manager.acquire_replica(master_as_replica_weight=0.0):
             pass
+
+
+async def test_power_of_two_choices_prefers_less_loaded_pool(
+    make_pool_manager,
+):
+    pool_manager = await make_pool_manager(
+        PowerOfTwoChoicesBalancerPolicy,
+        replicas_count=2,
+    )
+    await pool_manager.ready()
+    busy_pool, idle_pool = await pool_manager.get_replica_pools()
+
+    async with pool_manager.acquire_from_pool(busy_pool):
+        pool_manager._add_inflight(busy_pool)
+        for _ in range(10):
+            pool = await pool_manager.balancer.get_pool(read_only=True)
+            assert pool is idle_pool
+        pool_manager._remove_inflight(busy_pool)
+
+
+@balancer_policies
+async def test_skip_saturated_pool(make_pool_manager, balancer_policy):
+    pool_manager = await make_pool_manager(balancer_policy, replicas_count=2)
+    await pool_manager.ready()
+    saturated_pool, idle_pool = await pool_manager.get_replica_pools()
+    held = []
+    while saturated_pool.freesize:
+        held.append(saturated_pool.free.get_nowait())
+    # An acquire of the manager waiting for a connection of the pool
+    pool_manager._add_inflight(saturated_pool)
+    assert pool_manager.get_pool_waiters(saturated_pool) == 1
+    assert pool_manager.pool_is_saturated(saturated_pool)
+    assert not pool_manager.pool_is_saturated(idle_pool)
+
+    for _ in range(10):
+        assert pool_manager.balancer.try_get_pool(read_only=True) is idle_pool
+        pool = await pool_manager.balancer.get_pool(read_only=True)
+        assert pool is idle_pool
+
+    # Saturated pools are still used when nothing else is left
+    while idle_pool.freesize:
+        held.append(idle_pool.free.get_nowait())
+    pool_manager._add_inflight(idle_pool)
+    pool = await pool_manager.balancer.get_pool(read_only=True)
+    assert pool in (saturated_pool, idle_pool)
+
+    pool_manager._remove_inflight(saturated_pool)
+    pool_manager._remove_inflight(idle_pool)
+    for connection in held:
+        connection._pool.free.put_nowait(connection)
+
+
+async def test_greedy_prefers_pool_without_waiters(make_pool_manager):
+    pool_manager = await make_pool_manager(
+        GreedyBalancerPolicy,
+        replicas_count=2,
+    )
+    await pool_manager.ready()
+    busy_pool, idle_pool = await pool_manager.get_replica_pools()
+    pool_manager._add_inflight(busy_pool)
+    assert (
+        pool_manager.get_pool_load(busy_pool) >
+        pool_manager.get_pool_load(idle_pool)
+    )
+    for _ in range(10):
+        assert await pool_manager.balancer.get_pool(read_only=True) is idle_pool
+    pool_manager._remove_inflight(busy_pool)
+
+
+async def test_ewma_prefers_fast_pool(make_pool_manager):
+    pool_manager = await make_pool_manager(
+        EwmaBalancerPolicy,
+        replicas_count=2,
+    )
+    await pool_manager.ready()
+    slow_pool, fast_pool = await pool_manager.get_replica_pools()
+    pool_manager._add_acquire_time(slow_pool, 1.0)
+    pool_manager._add_acquire_time(fast_pool, 0.001)
+
+    chosen = [
+        await pool_manager.balancer.get_pool(read_only=True)
+        for _ in range(100)
+    ]
+    assert chosen.count(fast_pool) > 90
+
+
+@balancer_policies
+async def test_acquire_replica_within_max_lag(
+    make_pool_manager,
+    balancer_policy,
+):
+    pool_manager = await make_pool_manager(balancer_policy, replicas_count=2)
+    await pool_manager.ready()
+    lagging_pool, fresh_pool = await pool_manager.get_replica_pools()
+    lagging_pool.set_replication_lag(10.0)
+    fresh_pool.set_replication_lag(0.5)
+    await pool_manager.wait_next_pool_check()
+
+    async with timeout(1):
+        for _ in range(10):
+            async with pool_manager.acquire_replica(max_lag=1.0) as conn:
+                assert conn in fresh_pool.used
+
+
+@balancer_policies
+async def test_acquire_replica_within_max_lag_fallback_master(
+    make_pool_manager,
+    balancer_policy,
+):
+    pool_manager = await make_pool_manager(balancer_policy, replicas_count=2)
+    await pool_manager.ready()
+    for replica_pool in await pool_manager.get_replica_pools():
+        replica_pool.set_replication_lag(10.0)
+    await pool_manager.wait_next_pool_check()
+
+    async with timeout(1):
+        async with pool_manager.acquire_replica(
+            fallback_master=True,
+            max_lag=1.0,
+        ) as conn:
+            assert conn._pool.is_master
+
+    with pytest.raises(asyncio.TimeoutError):
+        async with pool_manager.acquire_replica(max_lag=1.0):
+            pass
+
+
+@balancer_policies
+async def test_acquire_replica_read_your_writes(
+    make_pool_manager,
+    balancer_policy,
+):
+    pool_manager = await make_pool_manager(balancer_policy, replicas_count=2)
+    await pool_manager.ready()
+    master_pool = (await pool_manager.get_master_pools())[0]
+    stale_pool, fresh_pool = await pool_manager.get_replica_pools()
+    master_pool.set_lsn(100)
+    stale_pool.set_lsn(50)
+    fresh_pool.set_lsn(150)
+    await pool_manager.wait_next_pool_check()
+
+    async with timeout(1):
+        async with pool_manager.acquire_master() as conn:
+            lsn = await pool_manager.capture_lsn(conn)
+        assert lsn == 100
+
+        for _ in range(10):
+            async with pool_manager.acquire_replica(min_lsn=lsn) as conn:
+                assert conn in fresh_pool.used
+
+        async with pool_manager.acquire_replica(min_lsn=200) as conn:
+            assert conn in master_pool.used
+
+
+async def test_round_robin_rotates_replicas(make_pool_manager):
+    pool_manager = await make_pool_manager(
+        RoundRobinBalancerPolicy,
+        replicas_count=3,
+    )
+    await pool_manager.ready()
+    replica_pools = pool_manager.replica_pools
+
+    chosen = [
+        await pool_manager.balancer.get_pool(read_only=True)
+        for _ in range(len(replica_pools) * 2)
+    ]
+    assert chosen == list(replica_pools) * 2
+
+
+@balancer_policies
+async def test_try_get_pool(make_pool_manager, balancer_policy):
+    pool_manager = await make_pool_manager(balancer_policy, replicas_count=0)
+    assert pool_manager.balancer.try_get_pool(read_only=False) is None
+
+    await pool_manager.ready()
+    master_pool = pool_manager.balancer.try_get_pool(read_only=False)
+    assert pool_manager.pool_is_master(master_pool)
+    assert pool_manager.balancer.try_get_pool(read_only=True) is None
+    assert pool_manager.balancer.try_get_pool(
+        read_only=True,
+        master_as_replica_weight=1.0,
+    ) is master_pool
+
+
+@balancer_policies
+async def test_acquire_does_not_wait_for_available_pool(
+    make_pool_manager,
+    balancer_policy,
+):
+    pool_manager = await make_pool_manager(balancer_policy)
+    await pool_manager.ready()
+
+    with mock.patch.object(pool_manager.balancer, "get_pool") as get_pool:
+        async with pool_manager.acquire_replica() as conn:
+            assert not conn._pool.is_master
+        async with pool_manager.acquire_master() as conn:
+            assert conn._pool.is_master
+
+    get_pool.assert_not_called()
+
+
+@balancer_policies
+async def test_get_pool_waits_again_without_candidates(
+    make_pool_manager, balancer_policy,
+):
+    pool_manager = await make_pool_manager(balancer_policy)
+    await pool_manager.ready()
+    balancer = pool_manager.balancer
+    assert balancer._choose_pool([]) is None
+
+    # The candidates are gone between the wakeup and the choice once
+    get_pool = balancer._get_pool
+    results = [None]
+
+    async def get_pool_once_gone(**kwargs):
+        if results:
+            return results.pop()
+        return await get_pool(**kwargs)
+
+    with mock.patch.object(
+        balancer, "_get_pool", side_effect=get_pool_once_gone,
+    ) as get_pool_mock:
+        async with timeout(1):
+            pool = await balancer.get_pool(read_only=True)
+    assert pool_manager.pool_is_replica(pool)
+    assert get_pool_mock.call_count == 2
@@ -0,0 +1,55 @@
+import pytest
+
+from benchmarks import BenchmarkCase, compare_results, run_case
+from benchmarks.acquire import POLICIES
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+@pytest.mark.parametrize("hosts", [1, 3])
+async def test_run_case(policy, hosts):
+    case = BenchmarkCase(
+        policy=policy, hosts=hosts, concurrency=20, acquires=200,
+    )
+    result = await run_case(case, refresh_delay=0.1, refresh_timeout=0.2)
+    assert result.name == case.name
+    assert result.acquires == 200
+    assert result.acquires_per_second > 0
+    assert 0 <= result.p50_ms <= result.p99_ms
+
+
+def test_compare_results():
+    baseline = [
+        {
+            "name": "greedy",
+            "acquires_per_second": 1000,
+            "p50_ms": 1.,
+            "p99_ms": 0.,
+        },
+        {
+            "name": "removed",
+            "acquires_per_second": 1000,
+            "p50_ms": 1.,
+            "p99_ms": 1.,
+        },
+    ]
+    current = [
+        {
+            "name": "greedy",
+            "acquires_per_second": 800,
+            "p50_ms": 0.5,
+            "p99_ms": 1.,
+        },
+        {
+            "name": "added",
+            "acquires_per_second": 1000,
+            "p50_ms": 1.,
+            "p99_ms": 1.,
+        },
+    ]
+    assert compare_results(baseline, current) == {
+        "greedy": {
+            "acquires_per_second": pytest.approx(0.2),
+            "p50_ms": pytest.approx(-0.5),
+            "p99_ms": None,
+        },
+    }
@@ -1,9 +1,22 @@
+import math
+import random
+import statistics
 from io import StringIO
 from typing import Iterable, Optional, Union
 
+import mock
 import pytest
 
-from hasql.utils import Dsn, host_is_ipv6_address, split_dsn
+from hasql.utils import (
+    Dsn,
+    Ewma,
+    SlidingWindow,
+    Stopwatch,
+    format_lsn,
+    host_is_ipv6_address,
+    parse_lsn,
+    split_dsn,
+)
 
 
 FORMAT_DSN_TEST_CASES = [
@@ -333,3 +346,82 @@ def test_connection_string_example_format():
     dsns = split_dsn(conn_str)
     assert len(dsns) == 1  # Should deduplicate identical host:port pairs
     assert str(dsns[0]) == "postgresql://localhost:5432/mydb?connect_timeout=10"
+
+
+def test_ewma():
+    ewma = Ewma(decay_time=10)
+    assert ewma.get("pool") is None
+
+    with mock.patch("time.monotonic", return_value=100):
+        ewma.add("pool", 1.0)
+        assert ewma.get("pool") == 1.0
+
+    with mock.patch("time.monotonic", return_value=110):
+        assert ewma.get("pool") == pytest.approx(math.exp(-1))
+        ewma.add("pool", 2.0)
+        assert ewma.get("pool") == pytest.approx(
+            math.exp(-1) + 2.0 * (1 - math.exp(-1)),
+        )
+
+
+def test_ewma_invalid_decay_time():
+    with pytest.raises(ValueError):
+        Ewma(decay_time=0)
+
+
+@pytest.mark.parametrize(
+    "lsn,value",
+    [
+        ("0/0", 0),
+        ("0/16B3748", 0x16B3748),
+        ("16/B374D848", (0x16 << 32) + 0xB374D848),
+    ],
+)
+def test_lsn(lsn: str, value: int):
+    assert parse_lsn(lsn) == value
+    assert format_lsn(value) == lsn
+
+
+def test_sliding_window_matches_statistics():
+    window = SlidingWindow(size=16)
+    samples = [random.random() for _ in range(100)]
+    for index, sample in enumerate(samples):
+        window.add(sample)
+        last = samples[max(0, index - 15):index + 1]
+        assert len(window) == len(last)
+        assert window.percentile(0.5) == pytest.approx(
+            statistics.median(last),
+        )
+        assert window.percentile(0) == min(last)
+        assert window.percentile(1) == max(last)
+
+
+def test_sliding_window_percentile():
+    window = SlidingWindow(size=128)
+    assert window.percentile(0.5) is None
+    for sample in range(101):
+        window.add(sample)
+    assert window.percentile(0.9) == pytest.approx(90)
+    assert window.percentile(0.99) == pytest.approx(99)
+
+    with pytest.raises(ValueError):
+        window.percentile(1.5)
+
+
+def test_stopwatch():
+    stopwatch = Stopwatch(window_size=4)
+    assert stopwatch.get_time("pool") is None
+
+    for elapsed in (4.0, 1.0, 3.0, 2.0, 5.0):
+        stopwatch.add("pool", elapsed)
+
+    assert stopwatch.get_time("pool") == 2.5
+    assert stopwatch.get_time("pool", 1.0) == 5.0
+
+    with stopwatch("other"):
+        pass
+    assert stopwatch.get_time("other") is not None
+
+    stopwatch.reset("pool")
+    assert stopwatch.get_time("pool") is None
+    assert stopwatch.get_time("other") is not None